@@ -2,11 +2,20 @@ import streamlit as st
 from utils import (
     get_company_cik,
     fetch_company_facts,
-    RedFlagAnalyzer,
-    generate_analysis_narrative
+    RedFlagAnalyzer
 )
-from utils.llm_integration_openai import generate_analysis_narrative
+from utils.llm_batch import BackgroundStream
+from utils.metrics import inc, span, start_metrics_server
+from utils.narrative_cache import narrative_key
+from utils.ticker_index import search_tickers
 from config import (
+    APP_FACTS_CACHE_TTL,
+    APP_ANALYSIS_CACHE_TTL,
+    APP_NARRATIVE_CACHE_TTL,
+    APP_CACHE_MAX_ENTRIES,
+    METRICS_PORT,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
     APP_TITLE,
     APP_SUBTITLE,
     DISCLAIMER,
@@ -23,6 +32,10 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Prometheus /metrics (once per process; reruns reuse it)
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
 # CSS customizado para interface minimalista
 st.markdown("""
 <style>
@@ -97,11 +110,22 @@ def main():
         st.markdown("<br>", unsafe_allow_html=True)  # Spacer
         analyze_button = st.button("Analyze", use_container_width=True)
     
+    # Sugestões por prefixo (ticker ou nome)
+    if ticker_input and not get_company_cik(ticker_input):
+        suggestions = search_tickers(ticker_input, limit=8)
+        if suggestions:
+            st.caption("Did you mean: " + " | ".join(
+                f"**{ticker}** ({title})" for ticker, _, title in suggestions
+            ))
+    
     # Mostrar tickers disponíveis
     with st.expander("Available Tickers"):
         tickers_list = ", ".join(sorted(TICKER_TO_CIK.keys()))
         st.text(tickers_list)
-        st.caption(f"Total: {len(TICKER_TO_CIK)} companies")
+        # No count of the full SEC list here: the expander body renders even when collapsed,
+        # and the index should only load once a search runs
+        st.caption(f"Featured: {len(TICKER_TO_CIK)} companies | "
+                   f"Any ticker on the full SEC list works (type a ticker or company name)")
     
     # Processar análise
     if analyze_button:
@@ -122,6 +146,56 @@ def main():
     st.caption("Data source: SEC EDGAR | Analysis: Automated XBRL + AI")
 
 
+@st.cache_data(ttl=APP_FACTS_CACHE_TTL, max_entries=APP_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_company_facts(cik: str) -> dict:
+
+    # Only runs on a Streamlit cache miss
+    inc('cache_requests_total', cache='app_company_facts', result='miss')
+    company_data = fetch_company_facts(cik, selective=True)
+    if not company_data:
+        # Raising keeps failures out of the cache
+        raise ConnectionError("Failed to fetch data from SEC. Please try again.")
+    return company_data
+
+
+@st.cache_data(ttl=APP_ANALYSIS_CACHE_TTL, max_entries=APP_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_analysis(cik: str) -> dict:
+
+    inc('cache_requests_total', cache='app_analysis', result='miss')
+    company_data = load_company_facts(cik)
+    with span('analysis'):
+        return RedFlagAnalyzer(company_data).analyze_all()
+
+
+@st.cache_resource(ttl=APP_NARRATIVE_CACHE_TTL, max_entries=APP_CACHE_MAX_ENTRIES, show_spinner=False)
+def narrative_job(key: str, attempt: int, _results: dict) -> BackgroundStream:
+    # One generation per distinct findings, shared by every session asking for it
+    # (the OpenAI client stack loads here, not at app startup)
+    from utils.llm_integration_openai import stream_analysis_narrative
+    return BackgroundStream(stream_analysis_narrative(_results, raise_errors=True))
+
+
+@st.cache_resource(show_spinner=False)
+def narrative_attempts() -> dict:
+    # Narrative key -> generation currently shared (bumped after a failed one)
+    return {}
+
+
+def start_narrative(results: dict) -> BackgroundStream:
+
+    key = narrative_key(results, 'openai', OPENAI_MODEL, OPENAI_TEMPERATURE)
+    attempts = narrative_attempts()
+    job = narrative_job(key, attempts.get(key, 0), results)
+
+    # A finished failure (API error, 429, timeout) is not replayed to later
+    # sessions for the cache TTL; they start a new generation instead
+    if job.done and job.error is not None:
+        attempts[key] = attempts.get(key, 0) + 1
+        job = narrative_job(key, attempts[key], results)
+
+    return job
+
+
 def run_analysis(ticker: str):
 
     cik = get_company_cik(ticker)
@@ -130,29 +204,27 @@ def run_analysis(ticker: str):
         st.info("Tip: Check the available tickers list above")
         return
     
+    inc('app_analysis_requests_total')
+    
     try:
-        company_data = fetch_company_facts(cik)
-        
-        if not company_data:
-            st.error("Failed to fetch data from SEC. Please try again.")
-            return
+        with span('load_analysis'):
+            results = load_analysis(cik)
         
-    except Exception as e:
+    except ConnectionError as e:
         st.error(f"Error fetching data: {str(e)}")
         return
     
-    try:
-        analyzer = RedFlagAnalyzer(company_data)
-        results = analyzer.analyze_all()
-        
     except Exception as e:
         st.error(f"Error during analysis: {str(e)}")
         return
     
-    display_results(results)
+    # Start the narrative now so it generates while the breakdown renders
+    narrative = start_narrative(results)
+    
+    display_results(results, narrative)
 
 
-def display_results(results: dict):
+def display_results(results: dict, narrative: BackgroundStream):
 
     company_name = results['entity_name']
     overall = results['overall_assessment']
@@ -181,35 +253,8 @@ def display_results(results: dict):
     
     st.markdown("---")
 
-    with st.spinner("Generating analysis..."):
-        try:
-            print("\n" + "="*60)
-            print("DEBUG: calling generate_analysis_narrative")
-            print("="*60)
-            
-            narrative = generate_analysis_narrative(results)
-            
-            print(f"DEBUG: Narrative received. Type: {type(narrative)}")
-            print(f"DEBUG: Size: {len(narrative) if narrative else 0} caracteres")
-            print(f"DEBUG: First 100 chars: {narrative[:100] if narrative else 'Empty'}")
-            print("="*60 + "\n")
-            
-            st.markdown(f"<div class='ai-narrative'>{narrative}</div>", unsafe_allow_html=True)
-            
-            print("DEBUG: Narrative successful\n")
-            
-        except Exception as e:
-            print("\n" + "="*60)
-            print(f"DEBUG: exception")
-            print(f"Type: {type(e)}")
-            print(f"Message: {str(e)}")
-            print("="*60 + "\n")
-            
-            st.warning(f"Could not generate AI narrative: {str(e)}")
-            st.info("Showing rule-based analysis instead...")
-            from utils.llm_integration import generate_rule_based_analysis
-            narrative = generate_rule_based_analysis(results)
-            st.markdown(f"<div class='ai-narrative'>{narrative}</div>", unsafe_allow_html=True)
+    # Narrative goes here, but is streamed in after the breakdown and evidence render
+    narrative_slot = st.empty()
     
     # Red Flags Breakdown
     st.markdown("---")
@@ -255,6 +300,21 @@ def display_results(results: dict):
     )
     
     st.caption("Always verify automated findings with original SEC documents")
+    
+    display_narrative(narrative_slot, results, narrative)
+
+
+def display_narrative(slot, results: dict, stream: BackgroundStream):
+
+    try:
+        narrative = slot.write_stream(iter(stream))
+    except Exception as e:
+        st.warning(f"Could not generate AI narrative: {str(e)}")
+        from utils.llm_integration import generate_rule_based_analysis
+        narrative = generate_rule_based_analysis(results)
+    
+    # Re-render the finished text with the narrative styling
+    slot.markdown(f"<div class='ai-narrative'>{narrative}</div>", unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Third-party stacks worth keeping out of an import
+HEAVY = ('pandas', 'numpy', 'pyarrow', 'requests', 'streamlit', 'openai', 'huggingface_hub')
+
+_LLM_AND_UI = ('streamlit', 'openai', 'huggingface_hub')
+
+# Module -> heavy stacks it must not load when imported
+MODULES = {
+    'utils': HEAVY,
+    'utils.ticker_index': HEAVY,
+    'utils.metrics': HEAVY,
+    'utils.sec_api': ('pandas', 'numpy', 'pyarrow') + _LLM_AND_UI,
+    'utils.red_flag_analyzer': ('requests',) + _LLM_AND_UI,
+    'utils.screening': ('requests',) + _LLM_AND_UI,
+    'utils.backtest': ('requests',) + _LLM_AND_UI,
+    'utils.sweep': ('requests',) + _LLM_AND_UI,
+    'utils.batch': _LLM_AND_UI,
+    'utils.llm_integration': ('pandas', 'numpy', 'pyarrow') + _LLM_AND_UI,
+    'utils.llm_integration_openai': ('pandas', 'numpy', 'pyarrow', 'requests') + _LLM_AND_UI
+}
+
+# Runs in a fresh interpreter: time one import, report which heavy stacks it loaded
+_CHILD = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': [name for name in sys.argv[2:] if name in sys.modules]}))
+'''
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict:
+    """Median import time and whole-process time (interpreter start + import) over fresh interpreters"""
+    imports = []
+    processes = []
+    loaded = []
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT + os.pathsep + os.environ.get('PYTHONPATH', '')}
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', _CHILD, module, *HEAVY],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True
+        )
+        processes.append(time.perf_counter() - started)
+
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()
+            return {'error': error[-1] if error else f'exit code {completed.returncode}'}
+
+        result = json.loads(completed.stdout)
+        imports.append(result['seconds'])
+        loaded = result['loaded']
+
+    return {'seconds': statistics.median(imports), 'process_seconds': statistics.median(processes), 'loaded': loaded}
+
+
+def run_import_benchmarks(modules: List[str], repeat: int = 5) -> Dict:
+
+    results = {}
+    for module in modules:
+        result = measure_import(module, repeat)
+        results[module] = result
+
+        if 'error' in result:
+            print(f"{module:<32} skipped: {result['error']}", file=sys.stderr)
+            continue
+        print(
+            f"{module:<32} {result['seconds'] * 1000:8.1f} ms import "
+            f"{result['process_seconds'] * 1000:8.1f} ms process  loads: {', '.join(result['loaded']) or '-'}",
+            file=sys.stderr
+        )
+
+    return {'python': sys.version.split()[0], 'results': results}
+
+
+def check_imports(current: Dict, max_ms: float = 0.0) -> List[str]:
+    """Problems: forbidden stacks loaded by a module, or imports over max_ms (0 = no budget)"""
+    problems = []
+
+    for module, result in current['results'].items():
+        if 'error' in result:
+            continue
+
+        forbidden = [name for name in result['loaded'] if name in MODULES.get(module, ())]
+        if forbidden:
+            problems.append(f"{module} imports {', '.join(forbidden)}")
+
+        if max_ms and result['seconds'] * 1000 > max_ms:
+            problems.append(f"{module}: {result['seconds'] * 1000:.1f} ms import (budget {max_ms:.0f} ms)")
+
+    return problems
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Import time of project modules in fresh interpreters')
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=0.0, help='Fail when any import takes longer')
+    parser.add_argument('--output', help='Also write this run as JSON')
+    args = parser.parse_args()
+
+    current = run_import_benchmarks(args.modules, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    problems = check_imports(current, args.max_ms)
+    for problem in problems:
+        print(f"PROBLEM {problem}", file=sys.stderr)
+
+    if problems:
+        sys.exit(1)
+    print("Imports OK", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+import numpy as np
+import pandas as pd
+from config import FIELD_MAPPINGS
+from utils.facts_parser import parse_company_facts
+from utils.red_flag_analyzer import RedFlagAnalyzer
+from utils.extraction import extract_field_values_smart, get_yoy_comparison
+from benchmarks.synthetic import SIZES, synthetic_company_facts_bytes
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Below this a slowdown is timer noise, not a regression
+_NOISE_FLOOR_SECONDS = 0.002
+
+
+def benchmark_cases(raw: bytes) -> Dict[str, Callable[[], object]]:
+    """Hot paths, each as a zero-argument callable over one synthetic payload"""
+    company_data = json.loads(raw)
+    revenue_tags = FIELD_MAPPINGS['Revenues']
+
+    return {
+        'extract_field_values_smart': lambda: extract_field_values_smart(company_data, revenue_tags),
+        'get_yoy_comparison': lambda: get_yoy_comparison(company_data, 'Revenues'),
+        'analyze_all': lambda: RedFlagAnalyzer(company_data).analyze_all(),
+        'end_to_end': lambda: RedFlagAnalyzer(parse_company_facts(raw)).analyze_all(),
+        'end_to_end_json_loads': lambda: RedFlagAnalyzer(json.loads(raw)).analyze_all()
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> Dict:
+    """Median / min wall time over `repeat` runs, plus peak traced memory of one extra run"""
+    fn()  # Warm-up (imports, caches)
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    # Separate run: tracemalloc slows allocation-heavy code down several-fold
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': statistics.median(times), 'min_seconds': min(times), 'peak_bytes': peak}
+
+
+def run_benchmarks(sizes: List[str], repeat: int = 5, seed: int = 0) -> Dict:
+
+    results = {}
+    for size in sizes:
+        raw = synthetic_company_facts_bytes(1000 + list(SIZES).index(size), size, seed)
+        for case, fn in benchmark_cases(raw).items():
+            result = measure(fn, repeat)
+            result['payload_bytes'] = len(raw)
+            results[f'{case}[{size}]'] = result
+            print(
+                f"{case + '[' + size + ']':<40} {result['seconds'] * 1000:9.2f} ms "
+                f"(min {result['min_seconds'] * 1000:.2f})  peak {result['peak_bytes'] / 1024 ** 2:8.2f} MB",
+                file=sys.stderr
+            )
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor()
+        },
+        'results': results
+    }
+
+
+def compare_to_baseline(
+    current: Dict,
+    baseline: Dict,
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.2
+) -> List[str]:
+    """Regression messages for every case slower / hungrier than baseline beyond tolerance"""
+    regressions = []
+
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+
+        limit = before['seconds'] * (1 + time_tolerance)
+        if result['seconds'] > limit and result['seconds'] - before['seconds'] > _NOISE_FLOOR_SECONDS:
+            regressions.append(
+                f"{name}: {result['seconds'] * 1000:.2f} ms vs baseline {before['seconds'] * 1000:.2f} ms "
+                f"(+{(result['seconds'] / before['seconds'] - 1) * 100:.0f}%)"
+            )
+
+        if result['peak_bytes'] > before['peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: peak {result['peak_bytes'] / 1024 ** 2:.2f} MB vs baseline "
+                f"{before['peak_bytes'] / 1024 ** 2:.2f} MB "
+                f"(+{(result['peak_bytes'] / max(before['peak_bytes'], 1) - 1) * 100:.0f}%)"
+            )
+
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark extraction/analysis hot paths on synthetic companyfacts')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium', 'large', 'ge'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--output', help='Also write this run as JSON')
+    parser.add_argument('--time-tolerance', type=float, default=0.25, help='Allowed slowdown (0.25 = 25%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='Allowed peak memory growth')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        # Timings only mean something on the machine that recorded them, so no baseline
+        # is shipped; a comparison without one must not pass silently
+        print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        sys.exit(2)
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(current, baseline, args.time_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+
+    if regressions:
+        sys.exit(1)
+    print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, NamedTuple, Optional, Tuple
+from benchmarks.synthetic import synthetic_company_facts_bytes, synthetic_submissions
+
+
+_COMPANYFACTS_PATH = re.compile(r'^/api/xbrl/companyfacts/CIK(\d{10})\.json$')
+_SUBMISSIONS_PATH = re.compile(r'^/submissions/CIK(\d{10})\.json$')
+_BULK_PATH = '/Archives/edgar/daily-index/xbrl/companyfacts.zip'
+_TICKERS_PATH = '/files/company_tickers.json'
+
+
+class FaultProfile(NamedTuple):
+    """How badly the stand-in behaves; all defaults mean a perfect server"""
+    latency_ms: float = 0.0             # Median added latency per request
+    latency_spread: float = 0.0         # Lognormal sigma (0 = fixed latency)
+    error_rate_429: float = 0.0         # Share of requests answered 429
+    error_rate_503: float = 0.0         # Share of requests answered 503
+    retry_after: Optional[int] = None   # Retry-After seconds sent with 429/503
+    rate_limit: float = 0.0             # Requests/second before 429s (0 = unlimited; SEC allows 10)
+    bandwidth: float = 0.0              # Bytes/second per response (0 = unlimited)
+
+
+class StandinData:
+    """Payloads served by the stand-in: fixture files when present, synthetic otherwise
+
+    fixtures_dir mirrors SEC's paths (api/xbrl/companyfacts/CIK*.json,
+    submissions/CIK*.json, companyfacts.zip, company_tickers.json).
+    """
+
+    def __init__(self, fixtures_dir: Optional[str] = None, size: str = 'medium', bulk_companies: int = 50):
+
+        self.fixtures_dir = fixtures_dir
+        self.size = size
+        self.bulk_companies = bulk_companies
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def companyfacts(self, cik: str) -> bytes:
+
+        return self._cached(('companyfacts', cik), f'api/xbrl/companyfacts/CIK{cik}.json',
+                            lambda: synthetic_company_facts_bytes(int(cik), self.size))
+
+    def submissions(self, cik: str) -> bytes:
+
+        return self._cached(('submissions', cik), f'submissions/CIK{cik}.json',
+                            lambda: json.dumps(synthetic_submissions(int(cik), self.size)).encode('utf-8'))
+
+    def bulk_zip(self) -> bytes:
+
+        def build():
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for cik in range(1, self.bulk_companies + 1):
+                    archive.writestr(f'CIK{cik:010d}.json', synthetic_company_facts_bytes(cik, self.size))
+            return buffer.getvalue()
+
+        return self._cached(('bulk',), 'companyfacts.zip', build)
+
+    def company_tickers(self) -> bytes:
+
+        def build():
+            rows = {str(i): {'cik_str': cik, 'ticker': f'SYN{cik}', 'title': f'Synthetic Filer {cik}'}
+                    for i, cik in enumerate(range(1, self.bulk_companies + 1))}
+            return json.dumps(rows).encode('utf-8')
+
+        return self._cached(('tickers',), 'company_tickers.json', build)
+
+    def _cached(self, key: Tuple, fixture: str, build) -> bytes:
+
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        path = os.path.join(self.fixtures_dir, fixture) if self.fixtures_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                payload = f.read()
+        else:
+            payload = build()
+
+        with self._lock:
+            self._cache[key] = payload
+        return payload
+
+
+class SECStandinServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], data: StandinData, faults: FaultProfile = FaultProfile(), seed: int = 0):
+
+        super().__init__(address, _StandinHandler)
+        self.data = data
+        self.faults = faults
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'bytes': 0, 'status': {}}
+        self._lock = threading.Lock()
+        self._tokens = faults.rate_limit
+        self._updated = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def draw(self) -> Tuple[float, float]:
+        """(latency seconds, uniform roll for error injection), thread-safe"""
+        with self._lock:
+            latency = self.faults.latency_ms / 1000
+            if latency and self.faults.latency_spread:
+                latency *= self.random.lognormvariate(0, self.faults.latency_spread)
+            return latency, self.random.random()
+
+    def over_rate_limit(self) -> bool:
+
+        if not self.faults.rate_limit:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.faults.rate_limit, self._tokens + (now - self._updated) * self.faults.rate_limit)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return False
+            return True
+
+    def record(self, status: int, sent: int) -> None:
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += sent
+            self.stats['status'][status] = self.stats['status'].get(status, 0) + 1
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+
+        server = self.server
+        path = self.path.split('?', 1)[0]
+
+        if path == '/_stats':
+            return self._send(200, json.dumps(server.stats).encode('utf-8'), count=False)
+
+        latency, roll = server.draw()
+        if latency:
+            time.sleep(latency)
+
+        faults = server.faults
+        if server.over_rate_limit() or roll < faults.error_rate_429:
+            return self._send_error(429)
+        if roll < faults.error_rate_429 + faults.error_rate_503:
+            return self._send_error(503)
+
+        payload = self._payload(path)
+        if payload is None:
+            return self._send(404, b'{"error": "not found"}')
+
+        etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, b'', {'ETag': etag})
+
+        headers = {'ETag': etag}
+        if path.endswith('.json') and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        content_type = 'application/zip' if path.endswith('.zip') else 'application/json'
+        self._send(200, payload, headers, content_type)
+
+    def _payload(self, path: str) -> Optional[bytes]:
+
+        data = self.server.data
+
+        match = _COMPANYFACTS_PATH.match(path)
+        if match:
+            return data.companyfacts(match.group(1))
+
+        match = _SUBMISSIONS_PATH.match(path)
+        if match:
+            return data.submissions(match.group(1))
+
+        if path == _BULK_PATH:
+            return data.bulk_zip()
+        if path == _TICKERS_PATH:
+            return data.company_tickers()
+
+        return None
+
+    def _send_error(self, status: int) -> None:
+
+        headers = {}
+        if self.server.faults.retry_after is not None:
+            headers['Retry-After'] = str(self.server.faults.retry_after)
+        self._send(status, b'{"error": "injected"}', headers)
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        headers: Optional[Dict] = None,
+        content_type: str = 'application/json',
+        count: bool = True
+    ) -> None:
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        sent = 0
+        try:
+            bandwidth = self.server.faults.bandwidth
+            if not bandwidth or status == 304:
+                self.wfile.write(body)
+                sent = len(body)
+            else:
+                # Bandwidth cap: write in ~50ms slices
+                chunk = max(int(bandwidth / 20), 1)
+                for start in range(0, len(body), chunk):
+                    self.wfile.write(body[start:start + chunk])
+                    sent += len(body[start:start + chunk])
+                    time.sleep(len(body[start:start + chunk]) / bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+        if count:
+            self.server.record(status, sent)
+
+    def log_message(self, format, *args):
+        # Quiet by default; load tests make thousands of requests
+        pass
+
+
+def start_standin(
+    port: int = 0,
+    faults: FaultProfile = FaultProfile(),
+    data: Optional[StandinData] = None,
+    host: str = '127.0.0.1'
+) -> SECStandinServer:
+    """Start a stand-in on a background thread (port 0 = any free port); call .shutdown() when done"""
+    server = SECStandinServer((host, port), data or StandinData(), faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Local stand-in for the SEC EDGAR endpoints this project uses')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', help='Directory mirroring SEC paths; synthetic data fills the gaps')
+    parser.add_argument('--size', default='medium', help='Synthetic filer size (small, medium, large, ge)')
+    parser.add_argument('--bulk-companies', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--latency-spread', type=float, default=0.0, help='Lognormal sigma around --latency-ms')
+    parser.add_argument('--error-rate-429', type=float, default=0.0)
+    parser.add_argument('--error-rate-503', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=None)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Requests/second before answering 429')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='Bytes/second per response')
+    args = parser.parse_args()
+
+    faults = FaultProfile(
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        error_rate_429=args.error_rate_429,
+        error_rate_503=args.error_rate_503,
+        retry_after=args.retry_after,
+        rate_limit=args.rate_limit,
+        bandwidth=args.bandwidth
+    )
+    data = StandinData(args.fixtures, args.size, args.bulk_companies)
+    server = SECStandinServer((args.host, args.port), data, faults)
+
+    print(f"SEC stand-in on {server.base_url} (run the app/CLIs with SEC_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import json
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+from config import FIELD_MAPPINGS
+
+
+# (years of history, extra us-gaap concepts) per filer size
+SIZES = {
+    'small': (4, 40),
+    'medium': (10, 300),
+    'large': (20, 900),
+    'ge': (30, 2500)         # GE-sized: decades of filings, thousands of tags
+}
+
+# Concepts reported as period flows (with 'start'); everything else is instant
+_DURATION_METRICS = ('Revenues', 'OperatingIncome', 'OperatingCashFlow')
+
+_BASE_VALUES = {
+    'Revenues': 5e9,
+    'OperatingIncome': 6e8,
+    'TotalAssets': 2e10,
+    'CurrentAssets': 6e9,
+    'CurrentLiabilities': 4e9,
+    'LongTermDebt': 3e9,
+    'CurrentDebt': 4e8,
+    'OperatingCashFlow': 5e8,
+    'StockholdersEquity': 8e9
+}
+
+
+def synthetic_company_facts(cik: int, size: str = 'medium', seed: int = 0) -> Dict:
+    """A companyfacts payload shaped like SEC's, sized like a real filer
+
+    Every 10-Q/10-K restates the comparative prior-year period (so each
+    period appears in several filings), mapped metrics switch tags partway
+    through the history the way filers did around ASC 606, and a share of
+    facts come from 8-K/10-K/A filings that extraction has to drop.
+    """
+    years, extra_concepts = SIZES[size]
+    rng = random.Random(seed * 1000003 + cik)
+    first_year = 2024 - years
+    filings = _filings(cik, first_year, years)
+
+    us_gaap = {}
+    for metric, tags in FIELD_MAPPINGS.items():
+        # Older history under the second candidate tag, recent under the first
+        switch_year = first_year + years // 2 if len(tags) > 1 else first_year
+        base = _BASE_VALUES[metric]
+        duration = metric in _DURATION_METRICS
+
+        recent = _facts(rng, filings, base, duration, lambda fy: fy >= switch_year)
+        us_gaap[tags[0]] = _concept(tags[0], recent)
+        if len(tags) > 1:
+            older = _facts(rng, filings, base * 0.8, duration, lambda fy: fy < switch_year)
+            us_gaap[tags[1]] = _concept(tags[1], older)
+
+    for i in range(extra_concepts):
+        name = f'SyntheticDisclosure{i:04d}'
+        duration = i % 3 != 0
+        us_gaap[name] = _concept(name, _facts(rng, filings, 10 ** rng.uniform(5, 9), duration, lambda fy: True))
+
+    return {
+        'cik': cik,
+        'entityName': f'Synthetic Filer {cik} ({size})',
+        'facts': {
+            'dei': {
+                'EntityCommonStockSharesOutstanding': _concept(
+                    'EntityCommonStockSharesOutstanding',
+                    [{'end': f'{first_year + years - 1}-12-31', 'val': 1_000_000_000,
+                      'accn': filings[-1]['accn'], 'fy': first_year + years - 1, 'fp': 'FY',
+                      'form': '10-K', 'filed': filings[-1]['filed']}],
+                    unit='shares'
+                )
+            },
+            'us-gaap': us_gaap
+        }
+    }
+
+
+def synthetic_company_facts_bytes(cik: int, size: str = 'medium', seed: int = 0) -> bytes:
+
+    return json.dumps(synthetic_company_facts(cik, size, seed)).encode('utf-8')
+
+
+def synthetic_submissions(cik: int, size: str = 'medium') -> Dict:
+    """submissions/CIK##########.json matching synthetic_company_facts' filings (newest first)"""
+    years, _ = SIZES[size]
+    filings = sorted(_filings(cik, 2024 - years, years), key=lambda filing: filing['filed'], reverse=True)
+
+    return {
+        'cik': f'{cik:010d}',
+        'name': f'Synthetic Filer {cik} ({size})',
+        'tickers': [f'SYN{cik}'],
+        'filings': {
+            'recent': {
+                'accessionNumber': [filing['accn'] for filing in filings],
+                'filingDate': [filing['filed'] for filing in filings],
+                'reportDate': [filing['end'].isoformat() for filing in filings],
+                'form': [filing['form'] for filing in filings]
+            },
+            'files': []
+        }
+    }
+
+
+def _filings(cik: int, first_year: int, years: int) -> List[Dict]:
+
+    filings = []
+    for fy in range(first_year, first_year + years):
+        for quarter, fp in enumerate(('Q1', 'Q2', 'Q3', 'FY'), start=1):
+            end = date(fy, 3 * quarter, 30 if quarter in (2, 3) else 31)
+            form = '10-K' if fp == 'FY' else '10-Q'
+            filed = end + timedelta(days=60 if form == '10-K' else 40)
+            filings.append({
+                'accn': f'{cik:010d}-{str(fy)[2:]}-{quarter:06d}',
+                'fy': fy, 'fp': fp, 'form': form, 'end': end, 'filed': filed.isoformat()
+            })
+    return filings
+
+
+def _facts(rng: random.Random, filings: List[Dict], base: float, duration: bool, keep) -> List[Dict]:
+
+    facts = []
+    level = base
+    for filing in filings:
+        if not keep(filing['fy']):
+            continue
+
+        level *= 1 + rng.uniform(-0.08, 0.1)
+        value = level * (-1 if base > 0 and rng.random() < 0.05 else 1)
+
+        # Current period, then the prior-year comparative restated in the same filing
+        for years_back, scale in ((0, 1.0), (1, 0.93)):
+            end = filing['end'].replace(year=filing['end'].year - years_back)
+            fact = {'end': end.isoformat(), 'val': round(value * scale), 'accn': filing['accn'],
+                    'fy': filing['fy'], 'fp': filing['fp'], 'form': filing['form'], 'filed': filing['filed']}
+            if duration:
+                months = 12 if filing['fp'] == 'FY' else 3
+                fact = {'start': _months_before(end, months).isoformat(), **fact}
+            if years_back == 0 and rng.random() < 0.5:
+                fact['frame'] = f"CY{end.year}" + ('' if filing['fp'] == 'FY' else f"Q{(end.month - 1) // 3 + 1}")
+            facts.append(fact)
+
+        # Noise the form filter must drop
+        if rng.random() < 0.15:
+            facts.append({**facts[-2], 'form': rng.choice(('8-K', '10-K/A', 'S-1')), 'accn': f"{filing['accn']}-x"})
+
+    return facts
+
+
+def _concept(name: str, facts: List[Dict], unit: str = 'USD') -> Dict:
+
+    return {'label': name, 'description': f'Synthetic {name} disclosure.', 'units': {unit: facts}}
+
+
+def _months_before(day: date, months: int) -> date:
+
+    month = day.month - months
+    year = day.year + (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
@@ -1,9 +1,50 @@
-SEC_BASE_URL = 'https://data.sec.gov'
+import os
+
+
+SEC_BASE_URL = os.getenv('SEC_BASE_URL', 'https://data.sec.gov')   # Override to use a local stand-in
 SEC_HEADERS = {
     'User-Agent': 'SEC-RedFlags-App academic-research@example.com'
 }
 
 
+# SEC fair access: at most 10 requests/second per client
+SEC_RATE_LIMIT = 10.0           # Requests per second (token refill rate)
+SEC_RATE_BURST = 10             # Token bucket capacity
+SEC_TIMEOUT = 10                # Seconds
+SEC_MAX_RETRIES = 4             # Retries on 429/5xx and connection errors
+SEC_BACKOFF_BASE = 0.5          # Seconds, doubled on every retry
+SEC_BACKOFF_MAX = 30.0          # Seconds
+SEC_POOL_SIZE = 16              # Keep-alive connections per host
+
+
+# New-filing watcher (submissions feed polling)
+WATCHER_INTERVAL_PEAK = 15 * 60            # Seconds between polls in earnings season / when a filing is due
+WATCHER_INTERVAL_OFFPEAK = 4 * 60 * 60     # Seconds between polls otherwise
+WATCHER_FILING_DUE_DAYS = 80               # Days after a company's last 10-K/10-Q when the next one is due
+EARNINGS_SEASONS = [                       # (start month, day, end month, day)
+    (1, 15, 3, 31),                        # Q4 results and most 10-Ks
+    (4, 15, 5, 20),
+    (7, 15, 8, 20),
+    (10, 15, 11, 20)
+]
+
+
+# Local data (bulk archives, snapshots)
+DATA_DIR = os.getenv('RED_FLAGS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+BULK_COMPANYFACTS_ZIP = os.path.join(DATA_DIR, 'companyfacts.zip')   # https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip
+METRIC_STORE_DIR = os.path.join(DATA_DIR, 'metric_store')             # Arrow columnar metric store
+COMPANY_TICKERS_PATH = os.path.join(DATA_DIR, 'company_tickers.json')
+COMPANY_TICKERS_URL = 'https://www.sec.gov/files/company_tickers.json'
+
+
+# Local cache for companyfacts payloads
+CACHE_DIR = os.getenv('RED_FLAGS_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+COMPANY_FACTS_CACHE_TTL = 6 * 60 * 60          # Seconds before revalidating with SEC
+COMPANY_FACTS_CACHE_MAX_BYTES = 1024 ** 3      # 1 GB, least recently used evicted first
+ANALYSIS_CACHE_MAX_BYTES = 256 * 1024 ** 2     # Stored analyze_all results (incremental runs)
+WATCHER_STATE_PATH = os.path.join(CACHE_DIR, 'watcher_state.json')   # Last seen filing per watched CIK
+
+
 TICKER_TO_CIK = {
     'AAPL': '0000320193',   # Apple
     'MSFT': '0000789019',   # Microsoft
@@ -69,6 +110,10 @@ FIELD_MAPPINGS = {
 }
 
 
+# Only these filings feed the analysis
+REPORT_FORMS = ('10-K', '10-Q')
+
+
 RED_FLAG_THRESHOLDS = {
     'revenue_decline': {
         'red': -15.0,     # Dip > 15%
@@ -92,11 +137,46 @@ RED_FLAG_THRESHOLDS = {
     }
 }
 
+# Threshold sensitivity sweep (utils/sweep.py): candidate values per rule, the rest stay as above
+SWEEP_DEFAULT_GRID = {
+    'revenue_decline': {'red': [-20.0, -15.0, -10.0], 'yellow': [-5.0, -2.5]},
+    'margin_compression': {'red': [-7.5, -5.0, -3.0], 'yellow': [-2.0, -1.0]},
+    'debt_explosion': {'red': [35.0, 50.0, 75.0], 'yellow': [15.0, 20.0]},
+    'negative_cash_flow': {'red': [2, 3, 4], 'yellow': [1, 2]},
+    'liquidity_deterioration': {'red': [0.8, 1.0, 1.2], 'yellow': [1.2, 1.5]}
+}
+SWEEP_CHUNK_CELLS = 4_000_000      # Configurations x companies scored per array pass (bounds memory)
+
 
 HF_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
 HF_API_URL = f"https://router.huggingface.co/models/{HF_MODEL}"
 HF_MAX_TOKENS = 500
 HF_TEMPERATURE = 0.7
+HF_CHAT_MODEL = "zai-org/GLM-4.5"
+
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_MAX_TOKENS = 500
+OPENAI_TEMPERATURE = 0.7
+
+LLM_CONCURRENCY = 4          # Narratives generated at once by the batch API
+LLM_MAX_RETRIES = 3          # Retries after a rate-limited (429) response
+LLM_COOLDOWN_MAX = 60.0      # Seconds; cap on a pause requested by rate-limit headers
+
+NARRATIVE_CACHE_TTL = 7 * 24 * 60 * 60          # Seconds; narratives only change when findings do
+NARRATIVE_CACHE_MAX_BYTES = 64 * 1024 ** 2     # 64 MB, least recently used evicted first
+
+
+# Instrumentation (utils/metrics.py)
+METRICS_ENABLED = os.getenv('RED_FLAGS_METRICS', '1') != '0'
+METRICS_PORT = int(os.getenv('RED_FLAGS_METRICS_PORT', '0'))     # Serve /metrics on this port (0 = off)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)   # Seconds
+
+
+# Streamlit caches (shared by every session of the app process)
+APP_FACTS_CACHE_TTL = 60 * 60          # Seconds a fetched companyfacts payload is reused
+APP_ANALYSIS_CACHE_TTL = 60 * 60       # Seconds an analyze_all() result is reused
+APP_NARRATIVE_CACHE_TTL = 15 * 60      # Seconds a narrative job (running or finished) is shared
+APP_CACHE_MAX_ENTRIES = 500            # Per stage, least recently used dropped first
 
 
 APP_TITLE = "Red Flags Assistant"
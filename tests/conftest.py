@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project the way the app and CLIs do (utils.*, config, benchmarks.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
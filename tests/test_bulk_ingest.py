@@ -0,0 +1,30 @@
+import zipfile
+import pytest
+from benchmarks.synthetic import synthetic_company_facts_bytes
+from utils.bulk_ingest import analyze_bulk_company_facts, iter_bulk_company_facts
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_corrupt_member_fails_only_its_company(tmp_path, compression):
+
+    path = str(tmp_path / 'companyfacts.zip')
+    with zipfile.ZipFile(path, 'w', compression) as archive:
+        for cik in (1, 2, 3):
+            archive.writestr(f'CIK{cik:010d}.json', synthetic_company_facts_bytes(cik, 'small'))
+        info = archive.getinfo('CIK0000000002.json')
+
+    # Flip a byte inside the second member's data (bad CRC / broken deflate stream)
+    with open(path, 'r+b') as f:
+        f.seek(info.header_offset + 30 + len(info.filename) + 200)
+        byte = f.read(1)
+        f.seek(-1, 1)
+        f.write(bytes([byte[0] ^ 0x5A]))
+
+    assert [cik for cik, _ in iter_bulk_company_facts(path, selective=True)] == ['0000000001', '0000000003']
+
+    for workers in (1, 2):
+        results = {str(result['cik']).zfill(10): result for result in
+                   analyze_bulk_company_facts(path, workers=workers, chunk_size=1)}
+        assert sorted(results) == ['0000000001', '0000000002', '0000000003']
+        assert 'error' in results['0000000002']
+        assert 'error' not in results['0000000001'] and 'error' not in results['0000000003']
@@ -0,0 +1,90 @@
+import json
+import pytest
+from benchmarks.synthetic import synthetic_company_facts
+from config import REPORT_FORMS
+from utils.facts_parser import MAPPED_CONCEPTS, _parse_selective, parse_company_facts, prune_company_facts
+
+
+def _fact(val, form='10-K'):
+    return {'end': '2023-12-31', 'val': val, 'accn': '0000000007-24-000001', 'fy': 2023, 'fp': 'FY',
+            'form': form, 'filed': '2024-02-01'}
+
+
+def _tricky(description, units=None):
+    # Unmapped concepts around a mapped one, so a bad skip swallows or corrupts Revenues
+    skipped = {'label': 'Unmapped', 'description': description}
+    if units is not None:
+        skipped['units'] = units
+    return {
+        'cik': 7,
+        'entityName': 'Tricky "Filer" é',
+        'facts': {
+            'dei': {'EntityCommonStockSharesOutstanding': {'label': 'Shares', 'description': description,
+                                                           'units': {'shares': [_fact(5)]}}},
+            'us-gaap': {
+                'UnmappedBefore': skipped,
+                'Revenues': {'label': 'Revenues', 'description': 'r', 'units': {'USD': [_fact(100), _fact(90, '8-K')]}},
+                'UnmappedAfter': {'label': 'Other', 'description': description,
+                                  'units': {'USD': [_fact(1)], 'shares': [_fact(2)]}},
+                'Assets': {'label': 'Assets', 'description': description, 'units': {'USD': [_fact(50)]}}
+            }
+        }
+    }
+
+
+def _reordered(value):
+    if isinstance(value, dict):
+        return {key: _reordered(item) for key, item in reversed(list(value.items()))}
+    if isinstance(value, list):
+        return [_reordered(item) for item in value]
+    return value
+
+
+LAYOUTS = {
+    'compact': lambda document: json.dumps(document, separators=(',', ':')),
+    'spaced': json.dumps,
+    'indented': lambda document: json.dumps(document, indent=2),
+    'reordered': lambda document: json.dumps(_reordered(document), separators=(',', ':'))
+}
+
+DOCUMENTS = {
+    'small': lambda: synthetic_company_facts(3, 'small', seed=3),
+    'medium': lambda: synthetic_company_facts(4, 'medium', seed=4),
+    'plain': lambda: _tricky('Plain description', {'USD': [_fact(1), _fact(2, '8-K')], 'shares': [_fact(3)]}),
+    'close_sequence_in_string': lambda: _tricky('Ends ]}} early', {'USD': [_fact(1)]}),
+    'concept_end_in_string': lambda: _tricky('x}},"Revenues":{"units":{"USD":[]}}', {'USD': [_fact(1)]}),
+    'escapes': lambda: _tricky('Quote \" backslash \\ é {[ ]}', {'USD': [_fact(1)]}),
+    'empty_units': lambda: _tricky('No facts', {}),
+    'empty_unit_list': lambda: _tricky('No facts', {'USD': []}),
+    'no_units': lambda: _tricky('No units key')
+}
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_selective_parse_matches_full_parse(document, layout):
+
+    text = LAYOUTS[layout](DOCUMENTS[document]())
+
+    assert parse_company_facts(text.encode('utf-8')) == prune_company_facts(json.loads(text))
+
+
+@pytest.mark.parametrize('layout', ['compact', 'spaced'])
+@pytest.mark.parametrize('document', ['small', 'medium', 'plain', 'escapes', 'empty_unit_list'])
+def test_sec_layout_takes_the_selective_path(document, layout):
+
+    # SEC's own layout must not depend on the full-parse fallback
+    text = LAYOUTS[layout](DOCUMENTS[document]())
+
+    selective = _parse_selective(text, MAPPED_CONCEPTS, frozenset(REPORT_FORMS))
+
+    assert selective == prune_company_facts(json.loads(text))
+
+
+def test_only_mapped_concepts_and_report_forms_are_kept():
+
+    parsed = parse_company_facts(json.dumps(DOCUMENTS['plain']()))
+
+    assert set(parsed['facts']) == {'us-gaap'}
+    assert set(parsed['facts']['us-gaap']) == {'Revenues', 'Assets'}
+    assert [fact['val'] for fact in parsed['facts']['us-gaap']['Revenues']['units']['USD']] == [100]
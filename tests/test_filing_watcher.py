@@ -0,0 +1,124 @@
+import json
+import pytest
+import utils.sec_api
+from benchmarks.sec_standin import StandinData, start_standin
+from benchmarks.synthetic import synthetic_submissions
+from utils.disk_cache import DiskCache
+from utils.filing_watcher import FilingWatcher
+
+CIK = '0000000042'
+
+
+class WatchlistData(StandinData):
+    """Synthetic filers whose submissions feed a test can replace"""
+
+    def __init__(self):
+        super().__init__(size='small')
+        self.feeds = {}
+
+    def submissions(self, cik: str) -> bytes:
+        return self.feeds[cik] if cik in self.feeds else super().submissions(cik)
+
+
+def _feed(drop_latest: int = 0) -> bytes:
+    submissions = synthetic_submissions(int(CIK), 'small')
+    recent = submissions['filings']['recent']
+    for key in recent:
+        del recent[key][:drop_latest]
+    return json.dumps(submissions).encode('utf-8')
+
+
+@pytest.fixture
+def server():
+    server = start_standin(data=WatchlistData())
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def watcher(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.sec_api, '_facts_cache', DiskCache(str(tmp_path / 'companyfacts'), ttl_seconds=0, max_bytes=10 ** 8))
+    return FilingWatcher([CIK], state_path=str(tmp_path / 'state.json'), base_url=server.base_url)
+
+
+def _restart(watcher):
+    # Fresh watcher on the same state file, polls due again
+    restarted = FilingWatcher(watcher.ciks, state_path=watcher.state_path, base_url=watcher.base_url)
+    for entry in restarted.state.values():
+        entry['next_poll'] = 0
+    return restarted
+
+
+def test_first_poll_only_records_latest_filing(watcher):
+
+    assert watcher.poll_due() == []
+    assert list(watcher.process_jobs()) == []
+
+    entry = _restart(watcher).state[CIK]
+    assert entry['last_accession'] == json.loads(_feed())['filings']['recent']['accessionNumber'][0]
+    assert entry['etag']
+    assert 'pending' not in entry
+
+
+def test_unchanged_feed_is_not_modified(watcher):
+
+    watcher.poll_due()
+    watcher = _restart(watcher)
+
+    assert watcher.poll_due() == []
+    assert watcher.stats['not_modified'] == 1
+    assert watcher.stats['bytes'] == 0
+
+
+def test_new_accession_is_analyzed_once(server, watcher):
+
+    server.data.feeds[CIK] = _feed(drop_latest=1)
+    watcher.poll_due()
+    server.data.feeds[CIK] = _feed()
+    watcher = _restart(watcher)
+
+    new = watcher.poll_due()
+    assert [filing.accession for filing in new] == [json.loads(_feed())['filings']['recent']['accessionNumber'][0]]
+
+    # Pending until analyzed, across restarts
+    watcher = _restart(watcher)
+    assert watcher.pending()[CIK] == new
+
+    results = list(watcher.process_jobs())
+    assert len(results) == 1
+    assert results[0]['accession'] == new[0].accession
+    assert 'error' not in results[0]
+    assert results[0]['red_flags']
+
+    watcher = _restart(watcher)
+    assert watcher.pending() == {}
+    assert watcher.poll_due() == []
+
+
+@pytest.mark.parametrize('payload', [
+    b'{"filings": {"recent": {"accessionNumber": [',
+    b'{"filings": ["recent"]}',
+    b'{"filings": {"recent": {"form": 10}}}',
+    b'[]'
+])
+def test_bad_payload_is_retried_without_stopping_the_watchlist(server, watcher, payload):
+
+    watcher.ciks.append('0000000043')
+    server.data.feeds[CIK] = _feed(drop_latest=1)
+    watcher.poll_due()
+
+    server.data.feeds[CIK] = payload
+    watcher = _restart(watcher)
+    assert watcher.poll_due() == []
+    assert watcher.stats['errors'] == 1
+    assert watcher.stats['polls'] == 2
+
+    # No validators were kept for the bad body, so it is fetched (not 304'd) again
+    watcher = _restart(watcher)
+    watcher.poll_due()
+    assert watcher.stats['errors'] == 1
+    assert watcher.stats['not_modified'] == 1
+
+    server.data.feeds[CIK] = _feed()
+    watcher = _restart(watcher)
+    assert len(watcher.poll_due()) == 1
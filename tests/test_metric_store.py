@@ -0,0 +1,97 @@
+import os
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_company_facts
+from config import FIELD_MAPPINGS
+from utils.metric_index import build_panel_table
+from utils.screening import MetricPanel
+
+pytest.importorskip('pyarrow')
+from utils.metric_store import MetricStore
+
+
+@pytest.fixture
+def companies():
+    return [synthetic_company_facts(cik, 'small', seed=cik) for cik in (1, 2, 3)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricStore(str(tmp_path / 'store'))
+
+
+def _parts(store, name):
+    return sorted(os.listdir(os.path.join(store.root, name)))
+
+
+def test_panel_round_trips(store, companies):
+
+    store.ingest(companies, batch_size=2)
+    panel = MetricPanel.from_store(store)
+    expected, entities = build_panel_table(companies, panel.rules.metrics)
+
+    assert panel.entities == entities
+    assert panel.table['val'].dtype == expected['val'].dtype == 'int64'
+    pd.testing.assert_frame_equal(
+        panel.table[['cik', 'metric', 'end', 'val', 'form', 'accn']],
+        expected[['cik', 'metric', 'end', 'val', 'form', 'accn']].astype({'cik': 'int64'}),
+        check_dtype=False
+    )
+
+    screened = panel.screen()
+    assert screened == MetricPanel(companies).screen()
+    cash_flows = screened[1]['red_flags']['negative_cash_flow']['latest_cash_flows']
+    assert cash_flows and all(type(value) is int for value in cash_flows)
+
+
+def test_float_values_stay_float(store, companies):
+
+    revenues = companies[0]['facts']['us-gaap'][FIELD_MAPPINGS['Revenues'][0]]['units']['USD']
+    revenues[0]['val'] += 0.5
+    store.ingest(companies[:2])
+
+    # Like build_panel_table: int64 only when every value read is an integer
+    assert store.read('Revenues')['val'].dtype == 'float64'
+    assert store.read('Revenues', ciks=[2])['val'].dtype == 'int64'
+
+
+def test_reingest_supersedes_every_metric(store, companies):
+
+    store.ingest(companies)
+    assert not store.read('LongTermDebt', ciks=[1]).empty
+
+    company = synthetic_company_facts(1, 'small', seed=1)
+    for tag in FIELD_MAPPINGS['LongTermDebt']:
+        company['facts']['us-gaap'].pop(tag, None)
+    company['entityName'] = 'Renamed Filer'
+    store.ingest([company])
+
+    assert store.read('LongTermDebt', ciks=[1]).empty
+    assert not store.read('LongTermDebt', ciks=[2]).empty
+    assert store.entities()[1] == 'Renamed Filer'
+
+    before = {metric: store.read(metric) for metric in store.metrics()}
+    store.compact()
+    for metric, frame in before.items():
+        assert _parts(store, f'metric={metric}') == [_parts(store, f'metric={metric}')[0]]
+        pd.testing.assert_frame_equal(
+            store.read(metric).sort_values(['cik', 'end', 'accn'], ignore_index=True),
+            frame.sort_values(['cik', 'end', 'accn'], ignore_index=True),
+            check_categorical=False
+        )
+    assert store.entities()[1] == 'Renamed Filer'
+
+
+def test_entities_are_appended(store, companies):
+
+    store.ingest(companies[:2])
+    first = _parts(store, 'entities')
+    store.ingest(companies[2:])
+
+    assert _parts(store, 'entities')[:len(first)] == first
+    assert len(_parts(store, 'entities')) == 2
+    assert sorted(store.entities()) == [1, 2, 3]
+
+    store.compact()
+    assert len(_parts(store, 'entities')) == 1
+    assert sorted(store.entities()) == [1, 2, 3]
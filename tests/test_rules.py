@@ -0,0 +1,125 @@
+import json
+import os
+import pytest
+from benchmarks.synthetic import synthetic_company_facts
+from config import FIELD_MAPPINGS
+from utils.red_flag_analyzer import RedFlagAnalyzer
+from utils.rules import DEFAULT_RULES, RED_FLAG_RULES, Rule, RuleSet
+from utils.screening import screen_companies
+from utils.serialization import to_jsonable
+
+
+# analyze_all() of the original per-check implementation (before the rule
+# engine and metric index) on reference_companies(), with its end-date sort
+# made stable as in the metric index; ties were arbitrary before that
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'analyze_all_reference.json')
+
+
+def reference_companies():
+    """Fixed synthetic filers, perturbed to reach every insufficient-data / zero / negative branch"""
+    companies = []
+
+    for cik in range(1, 21):
+        company = synthetic_company_facts(cik, 'small', seed=cik)
+        us_gaap = company['facts']['us-gaap']
+
+        def facts(metric):
+            for tag in FIELD_MAPPINGS[metric]:
+                yield from us_gaap.get(tag, {}).get('units', {}).get('USD', [])
+
+        case = cik % 10
+        if case == 1:
+            for tag in FIELD_MAPPINGS['Revenues']:
+                us_gaap.pop(tag, None)
+        elif case == 2:
+            for tag in FIELD_MAPPINGS['LongTermDebt'] + FIELD_MAPPINGS['CurrentDebt']:
+                us_gaap.pop(tag, None)
+        elif case == 3:
+            for fact in facts('CurrentLiabilities'):
+                fact['val'] = 0
+        elif case == 4:
+            for fact in facts('OperatingCashFlow'):
+                fact['val'] = -abs(fact['val'])
+        elif case == 5:
+            for tag in FIELD_MAPPINGS['OperatingCashFlow']:
+                us_gaap.pop(tag, None)
+        elif case == 6:
+            for fact in facts('Revenues'):
+                fact['val'] = 0
+
+        companies.append(company)
+
+    return companies
+
+
+def _plain(result):
+    # Same plain-JSON types the CLIs write
+    return json.loads(json.dumps(result, default=to_jsonable))
+
+
+@pytest.fixture(scope='module')
+def companies():
+    return reference_companies()
+
+
+@pytest.fixture(scope='module')
+def reference():
+    with open(REFERENCE_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_analyze_all_matches_original_checks(companies, reference):
+
+    results = [_plain(RedFlagAnalyzer(company).analyze_all()) for company in companies]
+
+    assert len(results) == len(reference)
+    for result, expected in zip(results, reference):
+        assert result == expected, result['cik']
+
+
+def test_screening_matches_original_checks(companies, reference):
+
+    screened = screen_companies(companies)
+
+    for company, expected in zip(companies, reference):
+        assert _plain(screened[company['cik']]) == expected, company['cik']
+
+
+def test_custom_rule_is_extracted_and_scored(companies):
+
+    asset_decline = Rule(
+        name='asset_decline',
+        label='Total Assets (YoY)',
+        insufficient=(('missing(TotalAssets_current, TotalAssets_previous) | (TotalAssets_previous == 0)', 'assets'),),
+        value='(TotalAssets_current - TotalAssets_previous) / TotalAssets_previous * 100',
+        direction='below',
+        fields=(('change_pct', 'value'),),
+        messages=(('flagged', 'Total assets fell {magnitude:.1f}%'), (None, 'Total assets changed {value:.1f}%')),
+        thresholds={'red': -1000, 'yellow': -999}
+    )
+    rules = RuleSet(DEFAULT_RULES + (asset_decline,))
+
+    assert rules.metrics == RED_FLAG_RULES.metrics + ['TotalAssets']
+
+    result = screen_companies(companies[:3], rules=rules)[companies[0]['cik']]['red_flags']['asset_decline']
+    assert result['status'] == 'OK'
+    assert result['severity'] == 'GREEN'
+    assert result['message'] == f"Total assets changed {result['change_pct']:.1f}%"
+
+
+@pytest.mark.parametrize('expression', [
+    "__import__('os')",
+    'Revenues_current.__class__',
+    'Revenues_current and Revenues_previous',
+    'not Revenues_current',
+    'Revenues_current[0]',
+    'lambda: 1',
+    '0 < Revenues_current < 1',
+    "Revenues_current + 'x'",
+    'open(Revenues_current)',
+    '[x for x in Revenues_current]'
+])
+def test_compiler_rejects_expressions_outside_the_grammar(expression):
+
+    with pytest.raises(ValueError):
+        RuleSet([DEFAULT_RULES[0]._replace(value=expression)])
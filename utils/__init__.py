@@ -1,21 +1,33 @@
-from .sec_api import (
-    get_company_cik,
-    fetch_company_facts,
-    extract_metric,
-    get_yoy_comparison,
-    get_company_info
-)
+# Public names are imported on first access (PEP 562), so `import utils` or
+# `from utils import RedFlagAnalyzer` only loads the stack that name needs:
+# pandas for scoring, requests for fetching, the LLM clients for narratives.
+_EXPORTS = {
+    'get_company_cik': 'sec_api',
+    'fetch_company_facts': 'sec_api',
+    'fetch_many_company_facts': 'sec_api',
+    'extract_metric': 'extraction',
+    'get_yoy_comparison': 'extraction',
+    'get_company_info': 'extraction',
+    'RedFlagAnalyzer': 'red_flag_analyzer',
+    'analyze_many_companies': 'red_flag_analyzer',
+    'MetricPanel': 'screening',
+    'screen_companies': 'screening',
+    'generate_analysis_narrative': 'llm_integration'
+}
 
-from .red_flag_analyzer import RedFlagAnalyzer
+__all__ = list(_EXPORTS)
 
-from .llm_integration import generate_analysis_narrative
 
-__all__ = [
-    'get_company_cik',
-    'fetch_company_facts',
-    'extract_metric',
-    'get_yoy_comparison',
-    'get_company_info',
-    'RedFlagAnalyzer',
-    'generate_analysis_narrative'
-]
+def __getattr__(name: str):
+
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from importlib import import_module
+    value = getattr(import_module(f'{__name__}.{_EXPORTS[name]}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,141 @@
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List
+from config import RED_FLAG_THRESHOLDS
+from utils.metric_index import build_panel_table
+from utils.red_flag_analyzer import ANALYZED_METRICS
+from utils.rules import RED_FLAG_RULES, RuleSet
+from utils.extraction import yoy_series
+
+
+def backtest_features(table: pd.DataFrame, metrics: List[str] = ANALYZED_METRICS) -> pd.DataFrame:
+    """Check inputs as of every reporting period end, indexed by (cik, as_of)
+
+    Each row holds what latest_features() would see if the company's data
+    stopped at as_of: the newest period of every metric with end <= as_of
+    and its year-over-year comparison, plus the four newest 10-Q operating
+    cash flows up to that date. Values are as last reported (restatements
+    included), not as first filed.
+    """
+    columns = [f'{metric}_{which}' for metric in metrics for which in ('current', 'previous')]
+    if table.empty:
+        empty = pd.DataFrame(columns=columns + ['ocf_quarters', 'ocf_negative_streak'])
+        empty.index = pd.MultiIndex.from_arrays([[], []], names=['cik', 'as_of'])
+        return empty
+
+    # Every row's YoY comparison at once; row i is "latest" for as-of dates from its end on
+    history = yoy_series(table, by=['cik', 'metric'])
+    history['has_history'] = history.groupby(['cik', 'metric'], sort=False).cumcount(ascending=False).to_numpy() >= 1
+
+    dates = (
+        table[['cik', 'end']].drop_duplicates()
+        .rename(columns={'end': 'as_of'})
+        .sort_values('as_of', kind='stable')
+        .reset_index(drop=True)
+    )
+    features = dates.copy()
+
+    for metric in metrics:
+        rows = history.loc[history['metric'] == metric, ['cik', 'end', 'val', 'previous_val', 'has_history']]
+        matched = _as_of(dates, rows)
+        # A single period up to as_of gives no comparison at all
+        usable = matched['has_history'].eq(True).to_numpy()
+        features[f'{metric}_current'] = np.where(usable, matched['val'].to_numpy(dtype=float), np.nan)
+        features[f'{metric}_previous'] = np.where(usable, matched['previous_val'].to_numpy(dtype=float), np.nan)
+
+    features[['ocf_quarters', 'ocf_negative_streak']] = _cash_flow_streaks(table, dates)
+
+    return features.set_index(['cik', 'as_of']).sort_index()
+
+
+def _as_of(dates: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    # Newest row of the same company with end <= as_of, aligned to dates' order
+    rows = rows.sort_values('end', kind='stable')
+    return pd.merge_asof(dates, rows, left_on='as_of', right_on='end', by='cik', direction='backward')
+
+
+def _cash_flow_streaks(table: pd.DataFrame, dates: pd.DataFrame) -> np.ndarray:
+
+    quarterly = table[(table['metric'] == 'OperatingCashFlow') & (table['form'] == '10-Q')]
+    if quarterly.empty:
+        return np.zeros((len(dates), 2), dtype=np.int64)
+
+    # Oldest first, so a cumulative count inside each run of negatives is the
+    # streak starting at that quarter and going back in time
+    quarterly = quarterly.iloc[::-1]
+    groups = quarterly.groupby('cik', sort=False)
+    negative = (quarterly['val'] < 0).astype(np.int64)
+    run_id = (1 - negative).groupby(quarterly['cik']).cumsum()
+    run = negative.groupby([quarterly['cik'], run_id]).cumsum()
+
+    quarters = np.minimum(groups.cumcount().to_numpy() + 1, 4)
+    rows = pd.DataFrame({
+        'cik': quarterly['cik'].to_numpy(),
+        'end': quarterly['end'].to_numpy(),
+        'ocf_quarters': quarters,
+        'ocf_negative_streak': np.minimum(run.to_numpy(), quarters)
+    })
+
+    matched = _as_of(dates, rows)
+    return matched[['ocf_quarters', 'ocf_negative_streak']].fillna(0).to_numpy(dtype=np.int64)
+
+
+def backtest_table(
+    table: pd.DataFrame,
+    thresholds: Dict = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> pd.DataFrame:
+    """Severity and value of every rule plus the overall assessment at every as-of date"""
+    evaluation = rules.evaluate(backtest_features(table, rules.metrics), thresholds, details=False)
+    columns = (
+        [f'{check}_{field}' for check in rules.names for field in ('severity', 'value')]
+        + ['red_flags_count', 'yellow_flags_count', 'green_flags_count', 'overall_assessment']
+    )
+    return evaluation[columns]
+
+
+def backtest_companies(
+    companies: Iterable[Dict],
+    thresholds: Dict = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> pd.DataFrame:
+    """Historical red flags for many companies, indexed by (cik, as_of)"""
+    table, _ = build_panel_table(companies, rules.metrics)
+    return backtest_table(table, thresholds, rules)
+
+
+def backtest_company(
+    company_data: Dict,
+    thresholds: Dict = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> pd.DataFrame:
+    """Historical red flags for one company, indexed by as_of"""
+    return backtest_companies([company_data], thresholds, rules).droplevel('cik')
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Red flags at every past reporting period (CSV output)')
+    parser.add_argument('tickers', nargs='+', help='Tickers or CIKs')
+    parser.add_argument('--output', default='-', help='CSV file (default: stdout)')
+    args = parser.parse_args()
+
+    from utils.sec_api import fetch_company_facts, get_company_cik
+
+    companies = []
+    for ticker in args.tickers:
+        cik = ticker if ticker.isdigit() else get_company_cik(ticker)
+        company_data = fetch_company_facts(cik.zfill(10), selective=True) if cik else None
+        if company_data:
+            companies.append(company_data)
+        else:
+            print(f"Skipping {ticker}: no data", file=sys.stderr)
+
+    result = backtest_companies(companies)
+    result.to_csv(sys.stdout if args.output == '-' else args.output)
+
+
+if __name__ == "__main__":
+    main()
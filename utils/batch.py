@@ -0,0 +1,146 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, TextIO
+from config import SEC_RATE_LIMIT
+from utils.incremental import IncrementalAnalyzer
+from utils.red_flag_analyzer import RedFlagAnalyzer
+from utils.sec_api import configure_rate_limit, fetch_company_facts, get_company_cik
+from utils.serialization import to_jsonable
+
+
+def read_tickers(path: str) -> List[str]:
+    """One ticker (or 10-digit CIK) per line; blank lines and # comments ignored"""
+    tickers = []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            ticker = line.split('#', 1)[0].strip().upper()
+            if ticker:
+                tickers.append(ticker)
+
+    return list(dict.fromkeys(tickers))
+
+
+_incremental = None
+
+
+def analyze_ticker(ticker: str, incremental: bool = False) -> Dict:
+    """analyze_all() for one ticker, or a {'ticker', 'error'} record
+
+    incremental=True reuses the stored result when no new 10-K/10-Q
+    accession appeared since it was computed.
+    """
+    global _incremental
+    cik = ticker if ticker.isdigit() else get_company_cik(ticker)
+    if not cik:
+        return {'ticker': ticker, 'error': 'Ticker not found'}
+
+    company_data = fetch_company_facts(cik.zfill(10), selective=True)
+    if not company_data:
+        return {'ticker': ticker, 'cik': cik, 'error': 'Failed to fetch data from SEC'}
+
+    try:
+        if incremental:
+            if _incremental is None:
+                _incremental = IncrementalAnalyzer()
+            return {'ticker': ticker, **_incremental.analyze(company_data)}
+        return {'ticker': ticker, **RedFlagAnalyzer(company_data).analyze_all()}
+    except Exception as e:
+        return {'ticker': ticker, 'cik': cik, 'error': f'{type(e).__name__}: {e}'}
+
+
+def _analyze_chunk(tickers: List[str], incremental: bool = False) -> List[Dict]:
+
+    return [analyze_ticker(ticker, incremental) for ticker in tickers]
+
+
+def _init_worker(rate: float) -> None:
+    # Workers share SEC's limit instead of each taking all of it
+    configure_rate_limit(rate)
+
+
+def run_batch(
+    tickers: List[str],
+    workers: int = 4,
+    chunk_size: int = 8,
+    incremental: bool = False
+) -> Iterator[Dict]:
+    """Analyze tickers across a process pool, yielding results as chunks finish"""
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(SEC_RATE_LIMIT / workers,)
+    ) as executor:
+        futures = {executor.submit(_analyze_chunk, chunk, incremental): chunk for chunk in chunks}
+
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                # A crashed worker loses its whole chunk; report every ticker in it
+                results = [{'ticker': ticker, 'error': f'{type(e).__name__}: {e}'} for ticker in futures[future]]
+
+            for result in results:
+                yield result
+
+
+def write_jsonl(results: Iterator[Dict], output: TextIO) -> Dict:
+    """Stream results as JSON Lines and return run statistics"""
+    started = time.perf_counter()
+    stats = {'total': 0, 'ok': 0, 'failed': 0, 'failures': {}}
+
+    for result in results:
+        output.write(json.dumps(result, default=to_jsonable) + '\n')
+        output.flush()
+
+        stats['total'] += 1
+        if 'error' in result:
+            stats['failed'] += 1
+            stats['failures'][result.get('ticker', result.get('cik'))] = result['error']
+        else:
+            stats['ok'] += 1
+
+    stats['elapsed_seconds'] = time.perf_counter() - started
+    stats['companies_per_second'] = stats['total'] / stats['elapsed_seconds'] if stats['elapsed_seconds'] else 0.0
+
+    return stats
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Headless red-flag analysis for a list of tickers (JSON Lines output)')
+    parser.add_argument('--tickers-file', required=True, help='One ticker or CIK per line')
+    parser.add_argument('--output', default='-', help='JSONL file (default: stdout)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=8)
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse stored results for companies without new 10-K/10-Q filings')
+    args = parser.parse_args()
+
+    tickers = read_tickers(args.tickers_file)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    try:
+        stats = write_jsonl(run_batch(tickers, args.workers, args.chunk_size, args.incremental), output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"Analyzed {stats['total']} companies in {stats['elapsed_seconds']:.1f}s "
+        f"({stats['companies_per_second']:.2f}/s): {stats['ok']} ok, {stats['failed']} failed",
+        file=sys.stderr
+    )
+    for ticker, error in stats['failures'].items():
+        print(f"  {ticker}: {error}", file=sys.stderr)
+
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+import zipfile
+import zlib
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from config import BULK_COMPANYFACTS_ZIP
+from utils.facts_parser import parse_company_facts
+from utils.red_flag_analyzer import RedFlagAnalyzer
+from utils.serialization import to_jsonable
+
+
+def list_bulk_members(zip_path: str = BULK_COMPANYFACTS_ZIP, ciks: Optional[Iterable[str]] = None) -> List[str]:
+    """Member names of the bulk archive, optionally restricted to some CIKs"""
+    wanted = {str(cik).zfill(10) for cik in ciks} if ciks else None
+
+    with zipfile.ZipFile(zip_path) as archive:
+        names = [
+            name for name in archive.namelist()
+            if name.startswith('CIK') and name.endswith('.json')
+        ]
+
+    if wanted is not None:
+        names = [name for name in names if _member_cik(name) in wanted]
+
+    return names
+
+
+def iter_bulk_company_facts(
+    zip_path: str = BULK_COMPANYFACTS_ZIP,
+    ciks: Optional[Iterable[str]] = None,
+    members: Optional[List[str]] = None,
+    selective: bool = False
+) -> Iterator[Tuple[str, Dict]]:
+    """Stream (cik, company_facts) out of companyfacts.zip, one member in memory at a time
+
+    selective=True keeps only the concepts and forms the analysis reads.
+    Unreadable members (corrupt, bad JSON) are reported on stderr and skipped.
+    """
+    if members is None:
+        members = list_bulk_members(zip_path, ciks)
+
+    for cik, company_data, error in _read_members(zip_path, members, selective):
+        if error is None:
+            yield cik, company_data
+
+
+def _read_members(zip_path: str, members: List[str], selective: bool) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+    # (cik, company_facts, None), or (cik, None, error) for a member that can't be read
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in members:
+            try:
+                # Decompressed straight from the archive, never written to disk
+                with archive.open(name) as member:
+                    raw = member.read()
+                company_data = parse_company_facts(raw) if selective else json.loads(raw)
+            except (ValueError, zipfile.BadZipFile, zlib.error, EOFError, OSError) as e:
+                # A bad CRC, corrupt or truncated member only loses that company
+                print(f"Error: could not read {name}: {e}", file=sys.stderr)
+                yield _member_cik(name), None, f'{type(e).__name__}: {e}'
+                continue
+
+            yield _member_cik(name), company_data, None
+
+
+def analyze_bulk_company_facts(
+    zip_path: str = BULK_COMPANYFACTS_ZIP,
+    ciks: Optional[Iterable[str]] = None,
+    workers: int = 1,
+    chunk_size: int = 64
+) -> Iterator[Dict]:
+    """Run RedFlagAnalyzer over every company in the bulk archive
+
+    With workers > 1 each process opens the archive itself and takes
+    chunk_size members at a time, so memory stays bounded per worker.
+    Results are yielded as they finish (unordered when parallel).
+    """
+    members = list_bulk_members(zip_path, ciks)
+
+    if workers <= 1:
+        for result in _analyze_members((zip_path, members)):
+            yield result
+        return
+
+    chunks = [
+        (zip_path, members[i:i + chunk_size])
+        for i in range(0, len(members), chunk_size)
+    ]
+
+    with Pool(processes=workers) as pool:
+        for results in pool.imap_unordered(_analyze_members_list, chunks):
+            for result in results:
+                yield result
+
+
+def _analyze_members(job: Tuple[str, List[str]]) -> Iterator[Dict]:
+
+    zip_path, members = job
+
+    for cik, company_data, error in _read_members(zip_path, members, selective=True):
+        if error is not None:
+            yield {'cik': cik, 'error': error}
+            continue
+        try:
+            yield RedFlagAnalyzer(company_data).analyze_all()
+        except Exception as e:
+            yield {'cik': cik, 'error': f'{type(e).__name__}: {e}'}
+
+
+def _analyze_members_list(job: Tuple[str, List[str]]) -> List[Dict]:
+
+    return list(_analyze_members(job))
+
+
+def _member_cik(name: str) -> str:
+    # Members are named CIK##########.json
+    return name[3:-len('.json')]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Analyze every company in the SEC bulk companyfacts.zip (JSON Lines to stdout)')
+    parser.add_argument('zip_path', nargs='?', default=BULK_COMPANYFACTS_ZIP)
+    parser.add_argument('--cik', action='append', dest='ciks', help='Restrict to these CIKs (repeatable)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    args = parser.parse_args()
+
+    for result in analyze_bulk_company_facts(args.zip_path, args.ciks, args.workers, args.chunk_size):
+        sys.stdout.write(json.dumps(result, default=to_jsonable) + '\n')
+
+
+if __name__ == "__main__":
+    main()
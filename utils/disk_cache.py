@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import BinaryIO, Callable, Dict, Optional
+
+
+def write_atomic(path: str, write: Callable[[BinaryIO], None]) -> None:
+    """Write path through write(file) into a temp file in its directory, then os.replace() it in"""
+    # A unique temp file per call: threads and processes never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CacheEntry:
+
+    def __init__(self, data: bytes, meta: Dict, stored_at: float, ttl_seconds: float):
+
+        self.data = data
+        self.meta = meta
+        self.stored_at = stored_at
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def is_fresh(self) -> bool:
+        return (time.time() - self.stored_at) < self.ttl_seconds
+
+
+class DiskCache:
+    """Persistent byte cache with TTL freshness and LRU eviction under a size cap
+
+    Best effort: a failed read is a miss and a failed write (full or
+    read-only disk) only loses the entry, never the caller's result.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for key (fresh or stale), or None"""
+        data_path, meta_path = self._paths(key)
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            with open(data_path, 'rb') as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # Data file mtime doubles as the LRU access time
+        self._mark_used(data_path)
+
+        return CacheEntry(data, record.get('meta', {}), record.get('stored_at', 0.0), self.ttl_seconds)
+
+    def put(self, key: str, data: bytes, meta: Optional[Dict] = None) -> None:
+
+        data_path, meta_path = self._paths(key)
+        record = {'key': key, 'stored_at': time.time(), 'size': len(data), 'meta': meta or {}}
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_atomic(data_path, lambda f: f.write(data))
+            write_atomic(meta_path, lambda f: f.write(json.dumps(record).encode('utf-8')))
+        except OSError as e:
+            print(f"Cache write failed ({self.directory}): {e}", file=sys.stderr)
+            return
+
+        self.evict()
+
+    def touch(self, key: str, meta: Optional[Dict] = None) -> None:
+        """Mark an entry as revalidated (e.g. after a 304), restarting its TTL"""
+        data_path, meta_path = self._paths(key)
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        record['stored_at'] = time.time()
+        if meta:
+            record['meta'] = {**record.get('meta', {}), **meta}
+
+        try:
+            write_atomic(meta_path, lambda f: f.write(json.dumps(record).encode('utf-8')))
+        except OSError as e:
+            print(f"Cache write failed ({self.directory}): {e}", file=sys.stderr)
+            return
+        self._mark_used(data_path)
+
+    def delete(self, key: str) -> None:
+
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits max_bytes"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith('.data'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len('.data')]))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        # Oldest access first
+        for _, size, digest in sorted(entries):
+            for suffix in ('.data', '.meta.json'):
+                try:
+                    os.remove(os.path.join(self.directory, digest + suffix))
+                except OSError:
+                    pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _paths(self, key: str):
+
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return base + '.data', base + '.meta.json'
+
+    @staticmethod
+    def _mark_used(path: str) -> None:
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
@@ -0,0 +1,167 @@
+import sys
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from config import FIELD_MAPPINGS
+from utils.fact_records import FactRecords
+
+
+def extract_field_values_smart(
+    company_data: Dict, 
+    field_names: List[str], 
+    unit: str = 'USD'
+) -> pd.DataFrame:
+
+    records = FactRecords()
+    found = False
+
+    for field_name in field_names:
+        try:
+            facts = company_data['facts']['us-gaap'][field_name]['units'][unit]
+        except (KeyError, TypeError):
+            continue
+        records.add(None, field_name, facts)
+        found = True
+
+    if not found:
+        return pd.DataFrame()
+
+    # 10-K/10-Q only, newest first, one row per end date (earlier candidate field wins ties)
+    return records.resolve().to_frame(['end', 'val', 'fy', 'fp', 'form', 'field_source'])
+
+
+def extract_metric(
+    company_data: Dict, 
+    metric_name: str, 
+    verbose: bool = False
+) -> pd.DataFrame:
+
+    if metric_name not in FIELD_MAPPINGS:
+        if verbose:
+            print(f"Metric '{metric_name}' not mapped. Trying direct field...", file=sys.stderr)
+        return extract_field_values_smart(company_data, [metric_name])
+    
+    field_names = FIELD_MAPPINGS[metric_name]
+    df = extract_field_values_smart(company_data, field_names)
+    
+    if not df.empty and verbose:
+        sources = df['field_source'].unique()
+        print(f"{metric_name}: {len(df)} periods using {', '.join(sources)}", file=sys.stderr)
+    
+    return df
+
+
+def get_yoy_comparison(
+    company_data: Dict, 
+    metric_name: str
+) -> Tuple[Optional[float], Optional[float]]:
+
+    return yoy_from_frame(extract_metric(company_data, metric_name))
+
+
+def yoy_from_frame(df: pd.DataFrame) -> Tuple[Optional[float], Optional[float]]:
+    """(current, previous) for an extracted metric frame (newest period first)"""
+    if df.empty or len(df) < 2:
+        return None, None
+    
+    fp = df['fp'].to_numpy()
+    fy = df['fy'].to_numpy()
+    vals = df['val']
+    
+    # Same fiscal period of the prior fiscal year, else 4 periods back
+    matches = np.flatnonzero((fp[1:] == fp[0]) & (fy[1:] == fy[0] - 1))
+    
+    if len(matches):
+        previous = vals.iat[matches[0] + 1]
+    elif len(df) >= 5:
+        previous = vals.iat[4]
+    else:
+        previous = None
+    
+    return vals.iat[0], previous
+
+
+def yoy_series(df: pd.DataFrame, by: Optional[List[str]] = None) -> pd.DataFrame:
+    """Year-over-year comparison for every period at once
+
+    Adds previous_val, previous_end, previous_matched (False when the
+    4-periods-back fallback was used) and change_pct to each row, using the
+    same rule as yoy_from_frame: the first older row with the same fp and
+    fy - 1. Rows must be newest first; with `by` (e.g. ['cik', 'metric'])
+    each group must be contiguous and newest first.
+    """
+    by = list(by or [])
+    frame = df.reset_index(drop=True)
+    n = len(frame)
+    
+    positions = np.arange(n)
+    keys = by + ['fp', 'fy']
+    
+    # Self-join each row to the rows holding (fp, fy - 1) in the same group
+    current = frame[by + ['fp']].assign(fy=frame['fy'] - 1, pos=positions)
+    candidates = frame[by + ['fp', 'fy']].assign(prev_pos=positions)
+    current = current.dropna(subset=['fp', 'fy'])
+    candidates = candidates.dropna(subset=['fp', 'fy'])
+    
+    joined = current.merge(candidates, on=keys, how='inner')
+    joined = joined[joined['prev_pos'] > joined['pos']]
+    first_match = joined.groupby('pos')['prev_pos'].min()
+    
+    previous_pos = np.full(n, -1, dtype=np.int64)
+    previous_pos[first_match.index.to_numpy()] = first_match.to_numpy()
+    matched = previous_pos >= 0
+    
+    # Fallback: 4 rows further down the same group
+    if by:
+        rank = frame.groupby(by, sort=False).cumcount().to_numpy()
+        size = frame.groupby(by, sort=False)['val'].transform('size').to_numpy()
+    else:
+        rank = positions
+        size = np.full(n, n)
+    fallback = ~matched & (rank + 4 < size)
+    previous_pos[fallback] = positions[fallback] + 4
+    
+    has_previous = previous_pos >= 0
+    take = np.where(has_previous, previous_pos, 0)
+    
+    vals = frame['val'].to_numpy(dtype=float)
+    previous_val = np.where(has_previous, vals[take], np.nan)
+    
+    result = frame.copy()
+    result['previous_val'] = previous_val
+    result['previous_end'] = frame['end'].to_numpy()[take]
+    result.loc[~has_previous, 'previous_end'] = pd.NaT
+    result['previous_matched'] = matched
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (vals - previous_val) / previous_val * 100
+    result['change_pct'] = np.where(previous_val == 0, np.nan, change)
+    
+    return result
+
+
+def get_latest_quarterly_values(
+    company_data: Dict, 
+    metric_name: str, 
+    periods: int = 4
+) -> List[float]:
+
+    return quarterly_values_from_frame(extract_metric(company_data, metric_name), periods)
+
+
+def quarterly_values_from_frame(df: pd.DataFrame, periods: int = 4) -> List[float]:
+    """Latest 10-Q values of an extracted metric frame, newest first"""
+    if df.empty:
+        return []
+    
+    quarterly = df[df['form'] == '10-Q'].head(periods)
+    
+    return quarterly['val'].tolist()
+
+
+def get_company_info(company_data: Dict) -> Dict[str, str]:
+
+    return {
+        'name': company_data.get('entityName', 'Unknown'),
+        'cik': company_data.get('cik', 'Unknown')
+    }
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Hashable, List, Optional, Sequence
+from config import REPORT_FORMS
+
+
+# One row per fact; strings live once in the code tables of FactRecords
+FACT_DTYPE = np.dtype([
+    ('group', np.int32),     # Index into FactRecords.groups
+    ('source', np.int16),    # Index into FactRecords.sources (candidate tag)
+    ('end', np.int64),       # Days since 1970-01-01
+    ('val', np.float64),
+    ('fy', np.int32),        # MISSING_FY when absent
+    ('fp', np.int16),        # Index into FactRecords.fp_codes
+    ('form', np.int16)       # Index into FactRecords.form_codes
+])
+
+MISSING_FY = np.iinfo(np.int32).min
+
+# Resolution pd.to_datetime gives ISO date strings (ns before pandas 3, us since)
+_END_DTYPE = pd.to_datetime(pd.Series(['1970-01-01'])).dtype
+
+
+class FactRecords:
+    """Compact companyfacts facts: a structured array plus interned code tables
+
+    Replaces list-of-dicts -> DataFrame extraction. Only the fields the
+    checks read are kept (accession numbers as references to the parsed
+    JSON strings), dates are parsed once into int64 days, and form
+    filtering, sorting and de-duplication run on the array; a DataFrame
+    is only built from the resolved rows.
+    """
+
+    def __init__(self):
+
+        self.groups = []        # Group keys (metric, or (cik, metric)) in order of first appearance
+        self.sources = []
+        self.fp_codes = []
+        self.form_codes = []
+        self.integral = True    # Every val an int (the DataFrame column is int64, like pandas infers)
+        self.missing_fy = False
+        self.data = np.empty(0, dtype=FACT_DTYPE)
+        self.accn = np.empty(0, dtype=object)
+
+        self._codes = {'group': {}, 'source': {}, 'fp': {}, 'form': {}}
+        self._chunks = []
+        self._accn_chunks = []
+
+    def __len__(self) -> int:
+        self._flush()
+        return len(self.data)
+
+    def add(self, group: Hashable, source: str, facts: List[Dict]) -> None:
+        """Append one concept's facts (rows keep their order: earlier candidates first)"""
+        if not facts:
+            return
+
+        chunk = np.empty(len(facts), dtype=FACT_DTYPE)
+        chunk['group'] = self._code('group', self.groups, group)
+        chunk['source'] = self._code('source', self.sources, source)
+        chunk['end'] = np.array([fact['end'] for fact in facts], dtype='datetime64[D]').view(np.int64)
+
+        values = [fact.get('val') for fact in facts]
+        array = np.array(values)
+        if array.dtype.kind not in 'iu':
+            self.integral = False
+            array = np.array(values, dtype=np.float64)
+        chunk['val'] = array
+
+        fy = [fact.get('fy') for fact in facts]
+        if None in fy:
+            self.missing_fy = True
+            fy = [MISSING_FY if year is None else year for year in fy]
+        chunk['fy'] = fy
+
+        fp_codes = self._codes['fp']
+        chunk['fp'] = [fp_codes[fp] if fp in fp_codes else self._code('fp', self.fp_codes, fp)
+                       for fp in (fact.get('fp') for fact in facts)]
+        form_codes = self._codes['form']
+        chunk['form'] = [form_codes[form] if form in form_codes else self._code('form', self.form_codes, form)
+                         for form in (fact.get('form') for fact in facts)]
+
+        accn = np.empty(len(facts), dtype=object)
+        accn[:] = [fact.get('accn') for fact in facts]
+
+        self._chunks.append(chunk)
+        self._accn_chunks.append(accn)
+
+    def resolve(self, forms: Sequence[str] = REPORT_FORMS) -> 'FactRecords':
+        """Keep forms, then one row per (group, end), newest first
+
+        Groups keep their order of first appearance; on the same end date
+        the earlier-added candidate wins (lexsort is stable).
+        """
+        self._flush()
+        data = self.data
+
+        # Work on row indices; the records are gathered once at the end
+        rows = np.flatnonzero(np.isin(data['form'], [code for code, form in enumerate(self.form_codes) if form in forms]))
+        group = data['group'][rows]
+        end = data['end'][rows]
+
+        order = np.lexsort((-end, group))
+        rows, group, end = rows[order], group[order], end[order]
+
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (group[1:] != group[:-1]) | (end[1:] != end[:-1])
+        rows = rows[first]
+
+        resolved = FactRecords()
+        for name in ('groups', 'sources', 'fp_codes', 'form_codes', 'integral', 'missing_fy', '_codes'):
+            setattr(resolved, name, getattr(self, name))
+        resolved.data = data[rows]
+        resolved.accn = self.accn[rows]
+        return resolved
+
+    def to_frame(self, columns: List[str], group_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame of the given columns, dtypes as pandas infers them from the raw facts
+
+        group_columns names the parts of tuple group keys (e.g. ['cik', 'metric']),
+        or the single column a scalar key fills.
+        """
+        self._flush()
+        data = self.data
+        frame = {}
+
+        if group_columns:
+            keys = np.empty(len(self.groups), dtype=object)
+            keys[:] = self.groups
+            keys = keys[data['group']]
+            for i, name in enumerate(group_columns):
+                parts = keys if len(group_columns) == 1 else [key[i] for key in keys]
+                frame[name] = pd.Series(parts, dtype=object).infer_objects()
+
+        frame['end'] = data['end'].astype('datetime64[D]').astype(_END_DTYPE)
+        frame['val'] = data['val'].astype(np.int64) if self.integral else data['val']
+
+        frame['fy'] = data['fy'].astype(np.int64)
+        if self.missing_fy:
+            frame['fy'] = np.where(data['fy'] == MISSING_FY, np.nan, frame['fy'])
+
+        frame['fp'] = _decode(self.fp_codes, data['fp'])
+        frame['form'] = _decode(self.form_codes, data['form'])
+        frame['field_source'] = _decode(self.sources, data['source'])
+        frame['accn'] = self.accn
+
+        table = pd.DataFrame(frame)
+        return table[(group_columns or []) + columns]
+
+    def _code(self, table: str, values: List, value: Hashable) -> int:
+
+        codes = self._codes[table]
+        if value not in codes:
+            codes[value] = len(values)
+            values.append(value)
+        return codes[value]
+
+    def _flush(self) -> None:
+
+        if self._chunks:
+            self.data = np.concatenate([self.data] + self._chunks)
+            self.accn = np.concatenate([self.accn] + self._accn_chunks)
+            self._chunks = []
+            self._accn_chunks = []
+
+
+def _decode(values: List, codes: np.ndarray) -> np.ndarray:
+
+    table = np.empty(len(values), dtype=object)
+    table[:] = values
+    return table[codes]
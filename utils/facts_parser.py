@@ -0,0 +1,164 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple, Union
+from config import FIELD_MAPPINGS, REPORT_FORMS
+
+
+# Every us-gaap tag the analysis can read
+MAPPED_CONCEPTS = frozenset(tag for tags in FIELD_MAPPINGS.values() for tag in tags)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# An object closed and followed by another key: never inside one concept's units
+_MEMBER_END = re.compile(r'\}[ \t\n\r]*,[ \t\n\r]*"')
+_SKIP = object()
+
+
+def parse_company_facts(
+    raw: Union[bytes, str],
+    concepts: Optional[Iterable[str]] = None,
+    forms: Optional[Iterable[str]] = REPORT_FORMS
+) -> Dict:
+    """Parse a companyfacts document keeping only the us-gaap concepts we use
+
+    Walks the document incrementally and only decodes the values of wanted
+    concepts; everything else (dei, other taxonomies, unmapped concepts) is
+    skipped without building Python objects. Facts from forms not listed in
+    `forms` are dropped. The result has the same shape as the full document,
+    so it can be passed to RedFlagAnalyzer as is.
+    """
+    text = raw.decode('utf-8') if isinstance(raw, (bytes, bytearray)) else raw
+    concepts = MAPPED_CONCEPTS if concepts is None else frozenset(concepts)
+    forms = frozenset(forms) if forms is not None else None
+
+    try:
+        return _parse_selective(text, concepts, forms)
+    except (ValueError, IndexError):
+        # Unexpected layout (pretty-printed, unusual nesting): parse it all, then prune
+        return prune_company_facts(json.loads(text), concepts, forms)
+
+
+def prune_company_facts(
+    company_data: Dict,
+    concepts: Optional[Iterable[str]] = None,
+    forms: Optional[Iterable[str]] = REPORT_FORMS
+) -> Dict:
+    """Same filtering as parse_company_facts, applied to an already parsed document"""
+    concepts = MAPPED_CONCEPTS if concepts is None else frozenset(concepts)
+    forms = frozenset(forms) if forms is not None else None
+
+    us_gaap = (company_data.get('facts') or {}).get('us-gaap') or {}
+
+    pruned = {key: value for key, value in company_data.items() if key != 'facts'}
+    pruned['facts'] = {'us-gaap': {
+        name: _filter_forms(concept, forms)
+        for name, concept in us_gaap.items()
+        if name in concepts
+    }}
+
+    return pruned
+
+
+def _parse_selective(text: str, concepts: Set[str], forms: Optional[Set[str]]) -> Dict:
+
+    def top_level(key: str, i: int):
+        if key == 'facts':
+            return _walk_object(text, i, facts_member)
+        return _decoder.raw_decode(text, i)
+
+    def facts_member(taxonomy: str, i: int):
+        if taxonomy != 'us-gaap':
+            _, end = _walk_object(text, i, skip_concept)
+            return _SKIP, end
+        return _walk_object(text, i, concept_member)
+
+    def concept_member(name: str, i: int):
+        if name not in concepts:
+            return skip_concept(name, i)
+        concept, end = _decoder.raw_decode(text, i)
+        return _filter_forms(concept, forms), end
+
+    def skip_concept(name: str, i: int):
+        return _SKIP, _skip_concept(text, i)
+
+    result, end = _walk_object(text, _skip_ws(text, 0), top_level)
+
+    if _skip_ws(text, end) != len(text):
+        raise ValueError('Trailing data after companyfacts document')
+    if 'facts' not in result:
+        result['facts'] = {}
+    result['facts'].setdefault('us-gaap', {})
+
+    return result
+
+
+def _walk_object(text: str, i: int, on_member: Callable) -> Tuple[Dict, int]:
+    """Walk the object starting at text[i]; on_member(key, i) returns (value, end)"""
+    if text[i] != '{':
+        raise ValueError(f'Expected object at {i}')
+
+    obj = {}
+    i = _skip_ws(text, i + 1)
+    if text[i] == '}':
+        return obj, i + 1
+
+    while True:
+        if text[i] != '"':
+            raise ValueError(f'Expected key at {i}')
+        key, i = scanstring(text, i + 1)
+
+        i = _skip_ws(text, i)
+        if text[i] != ':':
+            raise ValueError(f'Expected ":" at {i}')
+
+        value, i = on_member(key, _skip_ws(text, i + 1))
+        if value is not _SKIP:
+            obj[key] = value
+
+        i = _skip_ws(text, i)
+        if text[i] == '}':
+            return obj, i + 1
+        if text[i] != ',':
+            raise ValueError(f'Expected "," or "}}" at {i}')
+        i = _skip_ws(text, i + 1)
+
+
+def _skip_concept(text: str, i: int) -> int:
+    """End index of the concept object at text[i] without decoding it
+
+    A concept is {"label":..,"description":..,"units":{"UNIT":[{fact},..],..}}
+    and facts are flat, so its first "]}}" closes it. A concept without
+    that ending (no or empty units) would stretch the span over the next
+    concept, which shows as an object closed before another key ("},\"");
+    that, or strings containing either sequence, make the walker raise and
+    fall back to a full parse.
+    """
+    if text[i] != '{':
+        raise ValueError(f'Expected concept object at {i}')
+
+    end = text.find(']}}', i)
+    if end == -1 or _MEMBER_END.search(text, i, end):
+        raise ValueError(f'Cannot delimit concept at {i}')
+
+    return end + 3
+
+
+def _filter_forms(concept: Dict, forms: Optional[Set[str]]) -> Dict:
+
+    if forms is None or not isinstance(concept, dict):
+        return concept
+
+    units = concept.get('units') or {}
+    filtered = dict(concept)
+    filtered['units'] = {
+        unit: [fact for fact in facts if fact.get('form') in forms]
+        for unit, facts in units.items()
+    }
+
+    return filtered
+
+
+def _skip_ws(text: str, i: int) -> int:
+
+    return _WHITESPACE.match(text, i).end()
@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import requests
+from config import (
+    SEC_BASE_URL,
+    REPORT_FORMS,
+    WATCHER_STATE_PATH,
+    WATCHER_INTERVAL_PEAK,
+    WATCHER_INTERVAL_OFFPEAK,
+    WATCHER_FILING_DUE_DAYS,
+    EARNINGS_SEASONS
+)
+from utils.disk_cache import write_atomic
+from utils.incremental import filing_accessions
+from utils.red_flag_analyzer import RedFlagAnalyzer
+from utils.sec_api import fetch_company_facts, get_company_cik, sec_get
+from utils.serialization import to_jsonable
+
+
+# companyfacts can lag the submissions feed; re-check this many cycles before analyzing anyway
+_MAX_FACTS_ATTEMPTS = 3
+
+
+class Filing(NamedTuple):
+    cik: str
+    accession: str
+    form: str
+    filing_date: str
+
+
+def in_earnings_season(day: date) -> bool:
+
+    for start_month, start_day, end_month, end_day in EARNINGS_SEASONS:
+        if (start_month, start_day) <= (day.month, day.day) <= (end_month, end_day):
+            return True
+    return False
+
+
+def recent_filings(submissions: Dict, cik: str, forms: Iterable[str] = REPORT_FORMS) -> List[Filing]:
+    """10-K/10-Q filings from a submissions payload, newest first"""
+    recent = (submissions.get('filings') or {}).get('recent') or {}
+    forms = set(forms)
+
+    return [
+        Filing(cik, accession, form, filing_date)
+        for accession, form, filing_date in zip(
+            recent.get('accessionNumber', []),
+            recent.get('form', []),
+            recent.get('filingDate', [])
+        )
+        if form in forms
+    ]
+
+
+class FilingWatcher:
+    """Polls the submissions feed of a watchlist and analyzes only new 10-K/10-Q filings
+
+    submissions/CIK##########.json is a few KB (and usually a 304) where
+    companyfacts is several MB, so companyfacts is only fetched once a new
+    accession shows up. Polls are frequent in earnings season or once a
+    company's next filing is due, sparse otherwise. The first poll of a CIK
+    only records its latest filing. State persists in state_path, including
+    each CIK's filings not yet analyzed ('pending'), so a restart or --once
+    run picks them up again instead of losing them.
+    """
+
+    def __init__(
+        self,
+        ciks: Iterable[str],
+        state_path: str = WATCHER_STATE_PATH,
+        base_url: Optional[str] = None,
+        forms: Iterable[str] = REPORT_FORMS
+    ):
+
+        self.ciks = [str(cik).zfill(10) for cik in dict.fromkeys(ciks)]
+        self.state_path = state_path
+        self.base_url = base_url or SEC_BASE_URL
+        self.forms = tuple(forms)
+
+        self.stats = {'polls': 0, 'not_modified': 0, 'new_filings': 0, 'bytes': 0, 'errors': 0}
+        self.state = self._load_state()
+
+    def poll_interval(self, cik: str, now: Optional[float] = None) -> float:
+        """Seconds until cik should be polled again"""
+        today = datetime.fromtimestamp(time.time() if now is None else now, timezone.utc).date()
+        if in_earnings_season(today):
+            return WATCHER_INTERVAL_PEAK
+
+        last_filed = self.state.get(cik, {}).get('last_filing_date')
+        if last_filed and (today - date.fromisoformat(last_filed)).days >= WATCHER_FILING_DUE_DAYS:
+            return WATCHER_INTERVAL_PEAK
+
+        return WATCHER_INTERVAL_OFFPEAK
+
+    def poll(self, cik: str) -> List[Filing]:
+        """Check one CIK and return its filings not seen before (newest first)"""
+        entry = self.state.setdefault(cik, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = sec_get(f'{self.base_url}/submissions/CIK{cik}.json', headers=headers)
+        self.stats['polls'] += 1
+
+        if response.status_code == 304:
+            self.stats['not_modified'] += 1
+            return []
+
+        response.raise_for_status()
+        self.stats['bytes'] += len(response.content)
+
+        filings = recent_filings(response.json(), cik, self.forms)
+        last_accession = entry.get('last_accession')
+        new = []
+
+        if filings:
+            entry['last_accession'] = filings[0].accession
+            entry['last_filing_date'] = filings[0].filing_date
+            if last_accession is not None:
+                for filing in filings:
+                    if filing.accession == last_accession:
+                        break
+                    new.append(filing)
+
+        # Only once the payload has been read: validators saved for a bad body
+        # would turn the next poll into a 304 and hide its filings for good
+        entry['etag'] = response.headers.get('ETag')
+        entry['last_modified'] = response.headers.get('Last-Modified')
+
+        return new
+
+    def poll_due(self, now: Optional[float] = None) -> List[Filing]:
+        """Poll every CIK whose interval has elapsed and record its new filings as pending"""
+        now = time.time() if now is None else now
+        found = []
+
+        for cik in self.ciks:
+            entry = self.state.setdefault(cik, {})
+            if entry.get('next_poll', 0) > now:
+                continue
+
+            try:
+                new = self.poll(cik)
+            except (requests.exceptions.RequestException, ValueError, AttributeError, TypeError) as e:
+                # Malformed payloads included: one bad CIK must not stop the watchlist
+                print(f"Error polling CIK{cik}: {e}", file=sys.stderr)
+                self.stats['errors'] += 1
+                new = []
+
+            entry['next_poll'] = now + self.poll_interval(cik, now)
+
+            pending = entry.setdefault('pending', [])
+            known = {item['accession'] for item in pending}
+            pending.extend(
+                {'accession': filing.accession, 'form': filing.form, 'filing_date': filing.filing_date}
+                for filing in new if filing.accession not in known
+            )
+            if not pending:
+                del entry['pending']
+            found.extend(new)
+
+        self.stats['new_filings'] += len(found)
+        self._save_state()
+        return found
+
+    def pending(self) -> Dict[str, List[Filing]]:
+        """Filings recorded by polls but not analyzed yet, per CIK"""
+        return {
+            cik: [Filing(cik, **item) for item in self.state[cik]['pending']]
+            for cik in self.ciks
+            if self.state.get(cik, {}).get('pending')
+        }
+
+    def process_jobs(self) -> Iterator[Dict]:
+        """Fetch companyfacts and run analyze_all() once per company with pending filings
+
+        A company's pending filings are only cleared once its analysis has
+        succeeded (and the result was consumed); failed fetches and analyses
+        are retried on the next cycle.
+        """
+        for cik, filings in self.pending().items():
+            entry = self.state[cik]
+            latest = max(filings, key=lambda filing: filing.filing_date)
+            company_data = fetch_company_facts(cik, selective=True, revalidate=True, base_url=self.base_url)
+
+            if not company_data:
+                yield {'cik': cik, 'accession': latest.accession, 'error': 'Failed to fetch data from SEC'}
+                continue
+
+            # The XBRL API can trail the filing by a while; retry on a later cycle
+            attempts = entry.get('attempts', 0) + 1
+            if latest.accession not in filing_accessions(company_data) and attempts < _MAX_FACTS_ATTEMPTS:
+                entry['attempts'] = attempts
+                self._save_state()
+                continue
+
+            try:
+                result = RedFlagAnalyzer(company_data).analyze_all()
+            except Exception as e:
+                yield {'cik': cik, 'accession': latest.accession, 'error': f'{type(e).__name__}: {e}'}
+                continue
+
+            yield {
+                'cik': cik,
+                'accession': latest.accession,
+                'form': latest.form,
+                'filing_date': latest.filing_date,
+                **result
+            }
+
+            entry.pop('pending', None)
+            entry.pop('attempts', None)
+            self._save_state()
+
+    def run(
+        self,
+        on_result: Callable[[Dict], None],
+        stop: Optional[threading.Event] = None,
+        max_cycles: Optional[int] = None
+    ) -> None:
+        """Poll / analyze until stop is set (or max_cycles polls have run)"""
+        stop = stop or threading.Event()
+        cycles = 0
+
+        while not stop.is_set():
+            self.poll_due()
+            for result in self.process_jobs():
+                on_result(result)
+
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+
+            next_poll = min((self.state.get(cik, {}).get('next_poll', 0) for cik in self.ciks), default=0)
+            stop.wait(max(next_poll - time.time(), 1.0))
+
+    def _load_state(self) -> Dict:
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        write_atomic(self.state_path, lambda f: f.write(json.dumps(self.state).encode('utf-8')))
+
+
+def main():
+
+    from utils.batch import read_tickers
+
+    parser = argparse.ArgumentParser(description='Watch a watchlist for new 10-K/10-Q filings and analyze them (JSON Lines output)')
+    parser.add_argument('--tickers-file', required=True, help='One ticker or CIK per line')
+    parser.add_argument('--output', default='-', help='JSONL file (default: stdout)')
+    parser.add_argument('--state', default=WATCHER_STATE_PATH)
+    parser.add_argument('--base-url', default=None, help=f'SEC host for submissions and companyfacts (default: {SEC_BASE_URL})')
+    parser.add_argument('--once', action='store_true', help='Poll every company once and exit')
+    args = parser.parse_args()
+
+    ciks = []
+    for ticker in read_tickers(args.tickers_file):
+        cik = ticker if ticker.isdigit() else get_company_cik(ticker)
+        if cik:
+            ciks.append(cik)
+        else:
+            print(f"Ticker not found: {ticker}", file=sys.stderr)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+
+    def on_result(result: Dict) -> None:
+        output.write(json.dumps(result, default=to_jsonable) + '\n')
+        output.flush()
+
+    watcher = FilingWatcher(ciks, state_path=args.state, base_url=args.base_url)
+    try:
+        watcher.run(on_result, max_cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        print(
+            f"{watcher.stats['polls']} polls ({watcher.stats['not_modified']} unchanged, "
+            f"{watcher.stats['bytes'] / 1024:.0f} KB), {watcher.stats['new_filings']} new filings",
+            file=sys.stderr
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional, Set
+from config import CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES, FIELD_MAPPINGS, RED_FLAG_THRESHOLDS, REPORT_FORMS
+from utils.disk_cache import DiskCache
+from utils.facts_parser import MAPPED_CONCEPTS
+from utils.red_flag_analyzer import RESULT_SCHEMA_VERSION, RedFlagAnalyzer
+from utils.rules import RED_FLAG_RULES
+from utils.serialization import to_jsonable
+
+
+def filing_accessions(
+    company_data: Dict,
+    concepts: Iterable[str] = MAPPED_CONCEPTS,
+    forms: Iterable[str] = REPORT_FORMS
+) -> Set[str]:
+    """Accession numbers of the 10-K/10-Q filings behind the concepts we analyze"""
+    us_gaap = (company_data.get('facts') or {}).get('us-gaap') or {}
+    forms = set(forms)
+
+    accessions = set()
+    for concept in concepts:
+        units = (us_gaap.get(concept) or {}).get('units') or {}
+        for facts in units.values():
+            accessions.update(fact['accn'] for fact in facts if fact.get('form') in forms and 'accn' in fact)
+
+    return accessions
+
+
+class IncrementalAnalyzer:
+    """analyze_all() that reuses the stored result while a company's filings are unchanged
+
+    Each result is persisted with the accession numbers it was built from
+    and a fingerprint of everything else that shapes it (RESULT_SCHEMA_VERSION,
+    the rule definitions, RED_FLAG_THRESHOLDS, FIELD_MAPPINGS); a company is
+    only re-extracted and re-scored when a 10-K/10-Q accession appears (or
+    disappears) or any of those change.
+    """
+
+    def __init__(self, cache: Optional[DiskCache] = None):
+
+        self.cache = cache or DiskCache(
+            os.path.join(CACHE_DIR, 'analysis'),
+            ttl_seconds=float('inf'),
+            max_bytes=ANALYSIS_CACHE_MAX_BYTES
+        )
+        self.reused = 0
+        self.recomputed = 0
+
+    def analyze(self, company_data: Dict) -> Dict:
+
+        cik = company_data.get('cik', 'Unknown')
+        key = f'analysis/CIK{cik}'
+        accessions = sorted(filing_accessions(company_data))
+        fingerprint = _analysis_fingerprint()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            try:
+                record = json.loads(cached.data)
+            except ValueError:
+                record = None
+
+            if record and record.get('accessions') == accessions and record.get('fingerprint') == fingerprint:
+                self.reused += 1
+                return record['result']
+
+        result = RedFlagAnalyzer(company_data).analyze_all()
+        self.recomputed += 1
+
+        payload = json.dumps({'accessions': accessions, 'fingerprint': fingerprint, 'result': result}, default=to_jsonable)
+        self.cache.put(key, payload.encode('utf-8'))
+
+        # Same plain-JSON types whether fresh or reused
+        return json.loads(payload)['result']
+
+
+def _analysis_fingerprint() -> str:
+
+    inputs = {
+        'schema': RESULT_SCHEMA_VERSION,
+        'rules': [rule.rule._asdict() for rule in RED_FLAG_RULES],
+        'thresholds': RED_FLAG_THRESHOLDS,
+        'field_mappings': FIELD_MAPPINGS,
+        'forms': REPORT_FORMS
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
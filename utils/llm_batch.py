@@ -0,0 +1,200 @@
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+from config import LLM_CONCURRENCY, LLM_COOLDOWN_MAX
+
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After / x-ratelimit-reset-* value ('2', '1.5s', '6m0s', '20ms' or an HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and ''.join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class NarrativeError(Exception):
+    """A provider could not produce a narrative; str() is the message shown to the user"""
+
+
+def with_error_text(tokens: Iterator[str]) -> Iterator[str]:
+    """tokens, ending with the NarrativeError's message instead of raising it"""
+    started = False
+    try:
+        for token in tokens:
+            started = True
+            yield token
+    except NarrativeError as e:
+        yield f"\n\n{e}" if started else str(e)
+
+
+class RateLimitGate:
+    """Shared pause for every caller of one LLM provider
+
+    Fed with response headers: a 429, or a window whose remaining requests /
+    tokens hit zero, holds all callers until the advertised reset instead of
+    letting each of them run into the limit on its own.
+    """
+
+    def __init__(self, cooldown_max: float = LLM_COOLDOWN_MAX):
+
+        self.cooldown_max = cooldown_max
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def update(self, headers, limited: bool = False) -> None:
+        """Record rate-limit headers; limited=True for a 429 response"""
+        if headers is None:
+            return
+
+        delay = None
+        if limited:
+            delay = parse_reset(headers.get('retry-after'))
+            if delay is None:
+                delay = parse_reset(headers.get('x-ratelimit-reset-requests')) or 1.0
+
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            if remaining is not None and remaining.strip() in ('0', '0.0'):
+                reset = parse_reset(headers.get(f'x-ratelimit-reset-{kind}'))
+                if reset is not None:
+                    delay = max(delay or 0.0, reset)
+
+        if delay:
+            with self._lock:
+                self._resume_at = max(self._resume_at, time.monotonic() + min(delay, self.cooldown_max))
+
+
+class BackgroundStream:
+    """Drains a token iterator on a background thread; any number of readers can replay it
+
+    Generation starts immediately (overlapping whatever the caller does
+    next), and a reader that joins late first gets everything produced so
+    far, then follows the live tokens. If the iterator raises, its message
+    ends the text and `error` is set, so callers can avoid sharing a failure.
+    """
+
+    def __init__(self, tokens: Iterator[str]):
+
+        self._tokens = []
+        self._done = False
+        self.error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(tokens,), daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def text(self) -> str:
+        with self._condition:
+            return ''.join(self._tokens)
+
+    def __iter__(self) -> Iterator[str]:
+
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self._tokens) and not self._done:
+                    self._condition.wait()
+                if position >= len(self._tokens):
+                    return
+                chunk = ''.join(self._tokens[position:])
+                position = len(self._tokens)
+            yield chunk
+
+    def _run(self, tokens: Iterator[str]) -> None:
+
+        try:
+            for token in tokens:
+                with self._condition:
+                    self._tokens.append(token)
+                    self._condition.notify_all()
+        except NarrativeError as e:
+            with self._condition:
+                self.error = str(e)
+                self._tokens.append(f"\n\n{e}" if self._tokens else str(e))
+        except Exception as e:
+            with self._condition:
+                self.error = f"{type(e).__name__}: {e}"
+                self._tokens.append(f"\n\n**Error:** {self.error}")
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+
+class NarrativeResult(NamedTuple):
+    index: int
+    entity_name: Optional[str]
+    narrative: str                 # Empty when generation failed
+    error: Optional[str] = None    # Why it failed (user-facing message), None on success
+
+
+async def generate_many(
+    analyses: Iterable[Dict],
+    generate: Callable[[Dict], str],
+    concurrency: int = LLM_CONCURRENCY
+) -> AsyncIterator[NarrativeResult]:
+    """Run generate() over many analyze_all() results, yielding narratives as they finish
+
+    `index` is the position in analyses; the pool size is the concurrency cap.
+    generate() reports a failure by raising (NarrativeError for provider
+    errors), which lands in the result's `error` with an empty narrative.
+    """
+    analyses = list(analyses)
+    if not analyses:
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def run(index: int, analysis: Dict) -> NarrativeResult:
+        try:
+            return NarrativeResult(index, analysis.get('entity_name'), generate(analysis))
+        except NarrativeError as e:
+            error = str(e)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return NarrativeResult(index, analysis.get('entity_name'), '', error)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    tasks = [loop.run_in_executor(executor, run, i, analysis) for i, analysis in enumerate(analyses)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stopping early must not wait for the narratives still queued
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,65 @@
 
 
-import requests
+import os
+import sys
+import threading
 import time
-from typing import Dict, Optional
-from config import HF_API_URL, HF_MAX_TOKENS, HF_TEMPERATURE
+from functools import partial
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional
+from config import HF_MAX_TOKENS, HF_TEMPERATURE, HF_CHAT_MODEL, LLM_CONCURRENCY
+from utils.llm_batch import NarrativeError, NarrativeResult, RateLimitGate, generate_many, with_error_text
+from utils.metrics import inc, observe, span
+from utils.narrative_cache import get_cached_narrative, narrative_key, store_narrative
 
 
-def generate_analysis_narrative(analysis_results: Dict, use_fallback: bool = False) -> str:
+HF_TOKEN = os.getenv("HF_TOKEN", "")
+
+_client = None
+_client_lock = threading.Lock()
+_rate_gate = RateLimitGate()
+
+_NO_RESPONSE = "⚠️ **LLM Error:** The AI model did not respond after multiple attempts. This may be due to high demand on the free Hugging Face API. Please try again in a few moments, or enable fallback mode in the code."
+
+
+def get_hf_client():
+    """Process-wide InferenceClient (reuses its HTTP session between calls)"""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            from huggingface_hub import InferenceClient
+            # None falls back to the token saved by `huggingface-cli login`
+            _client = InferenceClient(
+                token=HF_TOKEN or None
+            )
+
+    return _client
+
+
+def generate_analysis_narrative(
+    analysis_results: Dict,
+    use_fallback: bool = False,
+    use_cache: bool = True,
+    raise_errors: bool = False
+) -> str:
+    """The narrative; on failure the rule-based analysis (use_fallback), a
+    user-facing message, or NarrativeError carrying it with raise_errors=True"""
+    try:
+        return _generate(analysis_results, use_fallback, use_cache)
+    except NarrativeError as e:
+        if raise_errors:
+            raise
+        return str(e)
+
+
+def _generate(analysis_results: Dict, use_fallback: bool, use_cache: bool) -> str:
+    
+    # Unchanged findings -> same narrative, no model call
+    cache_key = narrative_key(analysis_results, 'huggingface', HF_CHAT_MODEL, HF_TEMPERATURE)
+    if use_cache:
+        cached = get_cached_narrative(cache_key)
+        if cached is not None:
+            return cached
     
     prompt = build_analysis_prompt(analysis_results)
     
@@ -15,30 +68,83 @@ def generate_analysis_narrative(analysis_results: Dict, use_fallback: bool = Fal
         narrative = query_huggingface(prompt)
         
         if narrative:
-            print("="*70)
-            print("LLM connected!")
-            print("="*70 + "\n")
+            if use_cache:
+                store_narrative(cache_key, narrative)
+            print("="*70, file=sys.stderr)
+            print("LLM connected!", file=sys.stderr)
+            print("="*70 + "\n", file=sys.stderr)
             return narrative
         else:
-            print("="*70)
-            print("LLM not connected")
-            print("="*70 + "\n")
+            print("="*70, file=sys.stderr)
+            print("LLM not connected", file=sys.stderr)
+            print("="*70 + "\n", file=sys.stderr)
             
             if use_fallback:
-                print("Using fallback")
+                print("Using fallback", file=sys.stderr)
                 return generate_rule_based_analysis(analysis_results)
             else:
-                return "⚠️ **LLM Error:** The AI model did not respond after multiple attempts. This may be due to high demand on the free Hugging Face API. Please try again in a few moments, or enable fallback mode in the code."
+                raise NarrativeError(_NO_RESPONSE)
             
+    except NarrativeError:
+        raise
+    
     except Exception as e:
-        print(f"="*70)
-        print(f"ERROR: {e}")
-        print("="*70 + "\n")
+        print(f"="*70, file=sys.stderr)
+        print(f"ERROR: {e}", file=sys.stderr)
+        print("="*70 + "\n", file=sys.stderr)
         
         if use_fallback:
             return generate_rule_based_analysis(analysis_results)
         else:
-            return f"**Critical Error:** {str(e)}"
+            raise NarrativeError(f"**Critical Error:** {str(e)}") from e
+
+
+def stream_analysis_narrative(
+    analysis_results: Dict,
+    use_fallback: bool = False,
+    use_cache: bool = True,
+    raise_errors: bool = False
+) -> Iterator[str]:
+    """Yield the narrative as tokens arrive (cached or fallback text comes in one piece)
+
+    A failure ends the stream with a user-facing message, or raises
+    NarrativeError carrying it with raise_errors=True.
+    """
+    tokens = _stream(analysis_results, use_fallback, use_cache)
+    return tokens if raise_errors else with_error_text(tokens)
+
+
+def _stream(analysis_results: Dict, use_fallback: bool, use_cache: bool) -> Iterator[str]:
+
+    cache_key = narrative_key(analysis_results, 'huggingface', HF_CHAT_MODEL, HF_TEMPERATURE)
+    if use_cache:
+        cached = get_cached_narrative(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    prompt = build_analysis_prompt(analysis_results)
+    parts = []
+    
+    try:
+        for token in stream_huggingface(prompt):
+            parts.append(token)
+            yield token
+    except Exception as e:
+        print(f"Error on HF: {e}", file=sys.stderr)
+        if parts:
+            raise NarrativeError(f"⚠️ **LLM Error:** the response was interrupted ({e}).") from e
+    else:
+        narrative = ''.join(parts).strip()
+        if narrative:
+            if use_cache:
+                store_narrative(cache_key, narrative)
+            return
+    
+    if use_fallback:
+        yield generate_rule_based_analysis(analysis_results)
+    else:
+        raise NarrativeError(_NO_RESPONSE)
 
 
 def build_analysis_prompt(analysis_results: Dict) -> str:
@@ -78,38 +184,99 @@ Keep it concise and accessible. This is NOT investment advice - it's a transpare
 def query_huggingface(prompt: str, max_retries: int = 3) -> Optional[str]:
 
     try:
-        from huggingface_hub import InferenceClient
-        
-        # Criar cliente com seu token
-        client = InferenceClient(
-            token="HF_TOKEN"
-        )
-        
+        client = get_hf_client()
         
-        # Chamar modelo
-        response = client.chat_completion(
-            prompt,
-            model="zai-org/GLM-4.5",
-            max_tokens=500,
-            temperature=0.7,
-        )
+        # Chamar modelo; on 429 wait for the advertised reset and retry
+        with span('llm', provider='huggingface'):
+            for attempt in range(max_retries + 1):
+                _rate_gate.wait()
+                try:
+                    response = client.chat_completion(
+                        [{'role': 'user', 'content': prompt}],
+                        model=HF_CHAT_MODEL,
+                        max_tokens=HF_MAX_TOKENS,
+                        temperature=HF_TEMPERATURE,
+                    )
+                    break
+                except Exception as e:
+                    error_response = getattr(e, 'response', None)
+                    if getattr(error_response, 'status_code', None) != 429 or attempt == max_retries:
+                        raise
+                    inc('llm_requests_total', provider='huggingface', outcome='rate_limited')
+                    _rate_gate.update(error_response.headers, limited=True)
         
-        if response:
-            print(f" LLM connected! Size: {len(response)} char")
-            return response.strip()
+        text = (response.choices[0].message.content or '').strip() if response.choices else ''
+        inc('llm_requests_total', provider='huggingface', outcome='ok' if text else 'empty')
+        if text:
+            print(f" LLM connected! Size: {len(text)} char", file=sys.stderr)
+            return text
         else:
-            print("Answer empty")
+            print("Answer empty", file=sys.stderr)
             return None
             
     except ImportError:
-        print("huggingface_hub not installed!")
+        print("huggingface_hub not installed!", file=sys.stderr)
         return None
         
     except Exception as e:
-        print(f"Error on HF: {e}")
+        inc('llm_requests_total', provider='huggingface', outcome='error')
+        print(f"Error on HF: {e}", file=sys.stderr)
         return None
 
 
+def stream_huggingface(prompt: str, max_retries: int = 3) -> Iterator[str]:
+    """Like query_huggingface(), but yields tokens as the model produces them"""
+    client = get_hf_client()
+    
+    started = time.perf_counter()
+    
+    for attempt in range(max_retries + 1):
+        _rate_gate.wait()
+        try:
+            chunks = client.chat_completion(
+                [{'role': 'user', 'content': prompt}],
+                model=HF_CHAT_MODEL,
+                max_tokens=HF_MAX_TOKENS,
+                temperature=HF_TEMPERATURE,
+                stream=True,
+            )
+            break
+        except Exception as e:
+            error_response = getattr(e, 'response', None)
+            if getattr(error_response, 'status_code', None) != 429 or attempt == max_retries:
+                inc('llm_requests_total', provider='huggingface', outcome='error')
+                raise
+            inc('llm_requests_total', provider='huggingface', outcome='rate_limited')
+            _rate_gate.update(error_response.headers, limited=True)
+    
+    first = True
+    for chunk in chunks:
+        token = chunk.choices[0].delta.content if chunk.choices else None
+        if token:
+            if first:
+                observe('llm_first_token_seconds', time.perf_counter() - started, provider='huggingface')
+                first = False
+            yield token
+    
+    observe('red_flags_stage_seconds', time.perf_counter() - started, stage='llm', provider='huggingface')
+    inc('llm_requests_total', provider='huggingface', outcome='ok')
+
+
+async def generate_many_narratives(
+    analyses: Iterable[Dict],
+    concurrency: int = LLM_CONCURRENCY,
+    use_fallback: bool = False
+) -> AsyncIterator[NarrativeResult]:
+    """Narratives for many analyze_all() results, at most `concurrency` requests in flight
+
+    Failures are reported in NarrativeResult.error (with use_fallback the
+    rule-based analysis is returned as the narrative instead).
+    """
+    generate = partial(generate_analysis_narrative, use_fallback=use_fallback, raise_errors=True)
+    async for result in generate_many(analyses, generate, concurrency):
+        yield result
+
+
 def generate_rule_based_analysis(analysis_results: Dict) -> str:
 
     company_name = analysis_results['entity_name']
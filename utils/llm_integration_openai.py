@@ -1,33 +1,67 @@
 import os
-from typing import Dict
+import threading
+import time
+from functools import partial
+from typing import AsyncIterator, Dict, Iterable, Iterator
+from config import OPENAI_MODEL, OPENAI_MAX_TOKENS, OPENAI_TEMPERATURE, LLM_CONCURRENCY, LLM_MAX_RETRIES
+from utils.llm_batch import NarrativeError, NarrativeResult, RateLimitGate, generate_many, with_error_text
+from utils.metrics import inc, observe
+from utils.narrative_cache import get_cached_narrative, narrative_key, store_narrative
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY","")
 
+_client = None
+_client_lock = threading.Lock()
+_rate_gate = RateLimitGate()
 
-def generate_analysis_narrative(analysis_results: Dict) -> str:
-   
-    try:
-        from openai import OpenAI
-        
-        
-        if not OPENAI_API_KEY or OPENAI_API_KEY == "sk-...":
-            return "**OpenAI API Key nnot configured!**"
-        
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        
-        company_name = analysis_results['entity_name']
-        overall = analysis_results['overall_assessment']
-        summary = analysis_results['summary']
-        
-        findings = []
-        for flag_name, result in analysis_results['red_flags'].items():
-            if result['status'] == 'OK':
-                severity_emoji = '🔴' if result['severity'] == 'RED' else '🟡' if result['severity'] == 'YELLOW' else '🟢'
-                findings.append(f"{severity_emoji} {result['message']}")
-        
-        findings_text = "\n".join(findings)
-        
-        prompt = f"""You are a financial analyst explaining accounting stress signals to non-experts.
+
+def get_openai_client():
+    """Process-wide client (keeps its HTTP connection pool between calls)"""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=OPENAI_API_KEY, max_retries=LLM_MAX_RETRIES)
+
+    return _client
+
+
+def generate_analysis_narrative(analysis_results: Dict, use_cache: bool = True, raise_errors: bool = False) -> str:
+    """The narrative; on failure a user-facing message, or NarrativeError with raise_errors=True"""
+    tokens = _narrative(analysis_results, use_cache, stream=False)
+    return ''.join(tokens if raise_errors else with_error_text(tokens))
+
+
+def stream_analysis_narrative(
+    analysis_results: Dict,
+    use_cache: bool = True,
+    raise_errors: bool = False
+) -> Iterator[str]:
+    """Yield the narrative as tokens arrive (a cached narrative comes in one piece)
+
+    A failure ends the stream with a user-facing message, or raises
+    NarrativeError carrying it with raise_errors=True.
+    """
+    tokens = _narrative(analysis_results, use_cache, stream=True)
+    return tokens if raise_errors else with_error_text(tokens)
+
+
+def build_openai_prompt(analysis_results: Dict) -> str:
+
+    company_name = analysis_results['entity_name']
+    overall = analysis_results['overall_assessment']
+    summary = analysis_results['summary']
+    
+    findings = []
+    for flag_name, result in analysis_results['red_flags'].items():
+        if result['status'] == 'OK':
+            severity_emoji = '🔴' if result['severity'] == 'RED' else '🟡' if result['severity'] == 'YELLOW' else '🟢'
+            findings.append(f"{severity_emoji} {result['message']}")
+    
+    findings_text = "\n".join(findings)
+    
+    prompt = f"""You are a financial analyst explaining accounting stress signals to non-experts.
 
 Company: {company_name}
 Overall Signal: {overall}
@@ -44,38 +78,103 @@ Include the following points, each in one new paragraph:
 
 Keep it concise and accessible. This is NOT investment advice - it's a transparency tool."""
 
-        print("\n Calling OpenAI API...")
+    return prompt
+
+
+def _narrative(analysis_results: Dict, use_cache: bool, stream: bool) -> Iterator[str]:
+
+    # Unchanged findings -> same narrative, no API call
+    cache_key = narrative_key(analysis_results, 'openai', OPENAI_MODEL, OPENAI_TEMPERATURE)
+    if use_cache:
+        cached = get_cached_narrative(cache_key)
+        if cached is not None:
+            yield cached
+            return
+   
+    if not OPENAI_API_KEY or OPENAI_API_KEY == "sk-...":
+        raise NarrativeError("**OpenAI API Key nnot configured!**")
+    
+    try:
+        client = get_openai_client()
+        prompt = build_openai_prompt(analysis_results)
+
+        # Wait out a rate-limit window another call already ran into
+        _rate_gate.wait()
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
+        started = time.perf_counter()
+        raw = client.chat.completions.with_raw_response.create(
+            model=OPENAI_MODEL, 
             messages=[
                 {"role": "system", "content": "You are a financial transparency analyst helping non-experts understand company filings."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=500,
-            temperature=0.7
+            max_tokens=OPENAI_MAX_TOKENS,
+            temperature=OPENAI_TEMPERATURE,
+            stream=stream
         )
+        _rate_gate.update(raw.headers)
+        response = raw.parse()
+        
+        if stream:
+            parts = []
+            for chunk in response:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    if not parts:
+                        observe('llm_first_token_seconds', time.perf_counter() - started, provider='openai')
+                    parts.append(token)
+                    yield token
+            text = ''.join(parts).strip()
+        else:
+            text = response.choices[0].message.content.strip()
+            yield text
         
-        text = response.choices[0].message.content.strip()
+        observe('red_flags_stage_seconds', time.perf_counter() - started, stage='llm', provider='openai')
+        inc('llm_requests_total', provider='openai', outcome='ok')
         
-              
-        return text
+        if use_cache and text:
+            store_narrative(cache_key, text)
         
     except ImportError:
-        return "**OpenAI library not installed!**\n\nRun in terminal:\n```\npip install openai\n```"
+        raise NarrativeError("**OpenAI library not installed!**\n\nRun in terminal:\n```\npip install openai\n```")
     
     except Exception as e:
-        error_msg = str(e)
-        
-        # Mensagens de erro amigáveis
-        if "authentication" in error_msg.lower() or "api_key" in error_msg.lower():
-            return f"**Invalid API Key**\n\nYour OpenAI API key appears to be invalid. Please check:\n1. Go to https://platform.openai.com/api-keys\n2. Create a new key\n3. Copy and paste it in `utils/llm_integration_openai.py` line 18"
-        
-        elif "insufficient_quota" in error_msg.lower():
-            return f"**Insufficient Credits**\n\nYou need to add credits to your OpenAI account:\n1. Go to https://platform.openai.com/account/billing\n2. Add at least $5\n3. Try again"
-        
-        else:
-            return f"**OpenAI API Error**\n\n{error_msg}\n\nPlease check:\n- Your internet connection\n- Your API key is valid\n- You have credits in your account"
+        inc('llm_requests_total', provider='openai', outcome='error')
+        raise NarrativeError(_error_message(e)) from e
+
+
+def _error_message(e: Exception) -> str:
+
+    error_msg = str(e)
+    
+    response = getattr(e, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        _rate_gate.update(response.headers, limited=True)
+    
+    # Mensagens de erro amigáveis
+    if "authentication" in error_msg.lower() or "api_key" in error_msg.lower():
+        return f"**Invalid API Key**\n\nYour OpenAI API key appears to be invalid. Please check:\n1. Go to https://platform.openai.com/api-keys\n2. Create a new key\n3. Copy and paste it in `utils/llm_integration_openai.py` line 18"
+    
+    elif "insufficient_quota" in error_msg.lower():
+        return f"**Insufficient Credits**\n\nYou need to add credits to your OpenAI account:\n1. Go to https://platform.openai.com/account/billing\n2. Add at least $5\n3. Try again"
+    
+    else:
+        return f"**OpenAI API Error**\n\n{error_msg}\n\nPlease check:\n- Your internet connection\n- Your API key is valid\n- You have credits in your account"
+
+
+async def generate_many_narratives(
+    analyses: Iterable[Dict],
+    concurrency: int = LLM_CONCURRENCY
+) -> AsyncIterator[NarrativeResult]:
+    """Narratives for many analyze_all() results, at most `concurrency` requests in flight
+
+    All requests share one client and one rate-limit gate; results are
+    yielded as they finish (see NarrativeResult.index for the input order)
+    and failures are reported in NarrativeResult.error.
+    """
+    generate = partial(generate_analysis_narrative, raise_errors=True)
+    async for result in generate_many(analyses, generate, concurrency):
+        yield result
 
 
 def test_openai():
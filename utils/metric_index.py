@@ -0,0 +1,139 @@
+import time
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import FIELD_MAPPINGS
+from utils.fact_records import FactRecords
+from utils.extraction import yoy_from_frame, yoy_series, quarterly_values_from_frame
+
+
+METRIC_COLUMNS = ['end', 'val', 'fy', 'fp', 'form', 'field_source', 'accn']
+
+
+class MetricIndex:
+    """Every metric of one company extracted and resolved in a single pass
+
+    Same rows as extract_metric() per metric, but built from one combined
+    FactRecords array (one date parse, one sort), so the red-flag checks
+    can share it instead of re-extracting.
+    """
+
+    def __init__(
+        self,
+        company_data: Dict,
+        metrics: Optional[Iterable[str]] = None,
+        unit: str = 'USD'
+    ):
+
+        started = time.perf_counter()
+
+        self.metrics = list(metrics) if metrics is not None else list(FIELD_MAPPINGS)
+        self.table = build_metric_table(company_data, self.metrics, unit)
+        self._frames = {
+            metric: group.drop(columns='metric').reset_index(drop=True)
+            for metric, group in self.table.groupby('metric', sort=False)
+        } if not self.table.empty else {}
+
+        # Candidate tag that supplied the latest period of each metric
+        self.sources = {
+            metric: (self._frames[metric]['field_source'].iloc[0] if metric in self._frames else None)
+            for metric in self.metrics
+        }
+
+        self._indexed = None
+        self.build_seconds = time.perf_counter() - started
+
+    def get(self, metric: str) -> pd.DataFrame:
+        """Extracted rows for metric, newest first (empty frame if absent)"""
+        frame = self._frames.get(metric)
+        if frame is None:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        return frame
+
+    def yoy(self, metric: str) -> Tuple[Optional[float], Optional[float]]:
+
+        return yoy_from_frame(self.get(metric))
+
+    def yoy_history(self, metric: str) -> pd.DataFrame:
+        """YoY comparison for every period of metric (see yoy_series)"""
+        return yoy_series(self.get(metric))
+
+    def latest_quarterly(self, metric: str, periods: int = 4) -> List[float]:
+
+        return quarterly_values_from_frame(self.get(metric), periods)
+
+    def lookup(self, metric: str, fy: int, fp: str, form: str) -> pd.DataFrame:
+        """Rows for one (metric, fy, fp, form) key"""
+        indexed = self.indexed()
+        key = (metric, fy, fp, form)
+        if key not in indexed.index:
+            return indexed.iloc[0:0]
+        return indexed.loc[[key]]
+
+    def indexed(self) -> pd.DataFrame:
+        """The table keyed by (metric, fy, fp, form)"""
+        if self._indexed is None:
+            self._indexed = self.table.set_index(['metric', 'fy', 'fp', 'form']).sort_index()
+        return self._indexed
+
+
+def build_metric_table(
+    company_data: Dict,
+    metrics: Iterable[str],
+    unit: str = 'USD'
+) -> pd.DataFrame:
+    """Long table (metric, end, val, fy, fp, form, field_source, accn) for several metrics at once"""
+    records = collect_metric_records(company_data, metrics, unit)
+
+    if not len(records):
+        return pd.DataFrame(columns=['metric'] + METRIC_COLUMNS)
+
+    return records.resolve().to_frame(METRIC_COLUMNS, ['metric'])
+
+
+def build_panel_table(
+    companies: Iterable[Dict],
+    metrics: Iterable[str],
+    unit: str = 'USD'
+) -> Tuple[pd.DataFrame, Dict]:
+    """Metric table of many companies (leading cik column) plus {cik: entity name}
+
+    All companies share one FactRecords array; rows are grouped by
+    (cik, metric), newest first.
+    """
+    metrics = list(metrics)
+    records = FactRecords()
+    entities = {}
+
+    for company_data in companies:
+        cik = company_data.get('cik', 'Unknown')
+        entities[cik] = company_data.get('entityName', 'Unknown')
+        collect_metric_records(company_data, metrics, unit, records, cik)
+
+    columns = ['cik', 'metric'] + METRIC_COLUMNS
+    if not len(records):
+        return pd.DataFrame(columns=columns), entities
+
+    return records.resolve().to_frame(METRIC_COLUMNS, ['cik', 'metric']), entities
+
+
+def collect_metric_records(
+    company_data: Dict,
+    metrics: Iterable[str],
+    unit: str = 'USD',
+    records: Optional[FactRecords] = None,
+    cik: Optional[object] = None
+) -> FactRecords:
+    """Facts of every candidate field, grouped by metric (or (cik, metric) when cik is given)"""
+    us_gaap = (company_data.get('facts') or {}).get('us-gaap') or {}
+    records = records if records is not None else FactRecords()
+
+    for metric in metrics:
+        # Unmapped names are read as a direct field, like extract_metric()
+        for field_name in FIELD_MAPPINGS.get(metric, [metric]):
+            try:
+                facts = us_gaap[field_name]['units'][unit]
+            except (KeyError, TypeError):
+                continue
+            records.add(metric if cik is None else (cik, metric), field_name, facts)
+
+    return records
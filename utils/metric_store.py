@@ -0,0 +1,297 @@
+import argparse
+import os
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from config import FIELD_MAPPINGS, METRIC_STORE_DIR, BULK_COMPANYFACTS_ZIP
+from utils.disk_cache import write_atomic
+from utils.metric_index import METRIC_COLUMNS, build_panel_table
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+
+STORE_COLUMNS = ['cik', 'metric'] + METRIC_COLUMNS
+
+_PART_PATTERN = re.compile(r'^part-(\d+)\.arrow$')
+
+
+def _schema():
+
+    return pa.schema([
+        ('cik', pa.int64()),
+        ('metric', pa.dictionary(pa.int32(), pa.string())),
+        ('end', pa.timestamp('s')),
+        ('val', pa.float64()),
+        ('fy', pa.int32()),
+        ('fp', pa.dictionary(pa.int32(), pa.string())),
+        ('form', pa.dictionary(pa.int32(), pa.string())),
+        ('field_source', pa.dictionary(pa.int32(), pa.string())),
+        ('accn', pa.string()),
+        ('batch', pa.int64())
+    ])
+
+
+def _entity_schema():
+
+    return pa.schema([
+        ('cik', pa.int64()),
+        ('entity_name', pa.string()),
+        ('batch', pa.int64())
+    ])
+
+
+class MetricStore:
+    """Persistent columnar store of normalized metric series for every company
+
+    Layout: <root>/metric=<name>/part-<n>.arrow (uncompressed Arrow IPC, so
+    reads are memory-mapped) plus <root>/entities/part-<n>.arrow. Each write
+    is batch n: it appends part n to every metric it has rows for and to
+    entities, which records batch n as the current one of its companies.
+    Reads only keep a company's rows from its current batch, so a re-ingest
+    supersedes all of its older rows, including metrics it no longer
+    reports. The entities part is written last: an interrupted write leaves
+    the previous data in place. compact() folds parts back into one.
+    """
+
+    def __init__(self, root: str = METRIC_STORE_DIR):
+
+        if pa is None:
+            raise ImportError("pyarrow not installed! Run: pip install pyarrow")
+
+        self.root = root
+
+    def write(self, table: pd.DataFrame, entities: Optional[Dict] = None) -> None:
+        """Append a panel table (see build_panel_table), replacing the companies it contains
+
+        Companies in entities ({cik: name}) without rows are replaced too,
+        with no data.
+        """
+        names = {int(cik): name for cik, name in (entities or {}).items() if str(cik).isdigit()}
+        ciks = pd.unique(table['cik'].astype('int64')) if not table.empty else []
+        unnamed = [int(cik) for cik in ciks if int(cik) not in names]
+        if unnamed:
+            known = self.entities()
+            names.update({cik: known.get(cik, 'Unknown') for cik in unnamed})
+
+        if not names:
+            return
+
+        batch = self._next_batch()
+        for metric, rows in table.groupby('metric', sort=False):
+            directory = self._metric_dir(metric)
+            os.makedirs(directory, exist_ok=True)
+            self._write_file(os.path.join(directory, f'part-{batch:06d}.arrow'), self._to_arrow(rows, batch))
+
+        directory = os.path.join(self.root, 'entities')
+        os.makedirs(directory, exist_ok=True)
+        self._write_file(
+            os.path.join(directory, f'part-{batch:06d}.arrow'),
+            pa.table({
+                'cik': pa.array(list(names.keys()), pa.int64()),
+                'entity_name': pa.array(list(names.values()), pa.string()),
+                'batch': pa.array([batch] * len(names), pa.int64())
+            })
+        )
+
+    def ingest(self, companies: Iterable[Dict], metrics: Optional[Iterable[str]] = None, batch_size: int = 500) -> int:
+        """Extract and store companies in batches; returns how many were stored"""
+        metrics = list(metrics) if metrics is not None else list(FIELD_MAPPINGS)
+        batch = []
+        stored = 0
+
+        for company_data in companies:
+            batch.append(company_data)
+            if len(batch) >= batch_size:
+                stored += self._ingest_batch(batch, metrics)
+                batch = []
+
+        if batch:
+            stored += self._ingest_batch(batch, metrics)
+
+        return stored
+
+    def read_arrow(self, metric: str, ciks: Optional[Iterable[int]] = None, columns: Optional[List[str]] = None):
+        """One metric for the whole universe (or some CIKs) as a pyarrow Table, memory-mapped"""
+        table = self._current_rows(self._read_parts(self._metric_dir(metric), _schema()), self._current_batches())
+
+        if ciks is not None:
+            table = table.filter(pc.is_in(table['cik'], value_set=pa.array([int(cik) for cik in ciks], pa.int64())))
+
+        return table.select(columns or STORE_COLUMNS)
+
+    def read(self, metric: str, ciks: Optional[Iterable[int]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """One metric as a DataFrame (cik, metric, end, val, fy, fp, form, field_source, accn)"""
+        frame = self.read_arrow(metric, ciks, columns).to_pandas()
+
+        # Stored as float64; integers come back as int64, as build_panel_table gives them
+        if 'val' in frame and len(frame):
+            values = frame['val'].to_numpy()
+            if np.isfinite(values).all() and (values == np.floor(values)).all():
+                frame['val'] = values.astype(np.int64)
+        return frame
+
+    def read_panel(self, metrics: Iterable[str], ciks: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """Several metrics stacked like build_panel_table: grouped by (cik, metric), newest first"""
+        metrics = list(metrics)
+        frames = [self.read(metric, ciks) for metric in metrics]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+
+        table = pd.concat(frames, ignore_index=True)
+        table['metric'] = table['metric'].astype(str)
+        for column in ('fp', 'form', 'field_source'):
+            table[column] = table[column].astype(object)
+
+        table['_rank'] = table['metric'].map({metric: i for i, metric in enumerate(metrics)})
+        table = table.sort_values(['cik', '_rank', 'end'], ascending=[True, True, False], kind='stable')
+
+        return table.drop(columns='_rank').reset_index(drop=True)
+
+    def entities(self) -> Dict:
+        """{cik: entity name} of every stored company"""
+        table = self._read_parts(os.path.join(self.root, 'entities'), _entity_schema())
+        # Parts are read oldest first, so the latest name wins
+        return dict(zip(table['cik'].to_pylist(), table['entity_name'].to_pylist()))
+
+    def metrics(self) -> List[str]:
+
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted(name[len('metric='):] for name in names if name.startswith('metric='))
+
+    def compact(self) -> None:
+        """Rewrite every metric and the entities as a single part, dropping superseded rows"""
+        number = self._next_batch()
+        current = self._current_batches()
+
+        for metric in self.metrics():
+            directory = self._metric_dir(metric)
+            parts = self._parts(directory)
+            if len(parts) <= 1:
+                continue
+
+            merged = self._current_rows(self._read_parts(directory, _schema()), current)
+            merged = merged.take(pc.sort_indices(merged, [('cik', 'ascending'), ('end', 'descending')]))
+            self._write_file(os.path.join(directory, f'part-{number:06d}.arrow'), merged)
+
+            for _, path in parts:
+                os.remove(path)
+
+        # Entities last, so the metric parts above stay readable if this is interrupted
+        directory = os.path.join(self.root, 'entities')
+        parts = self._parts(directory)
+        if len(parts) > 1:
+            names = self.entities()
+            self._write_file(
+                os.path.join(directory, f'part-{number:06d}.arrow'),
+                pa.table({
+                    'cik': pa.array(list(current.keys()), pa.int64()),
+                    'entity_name': pa.array([names[cik] for cik in current], pa.string()),
+                    'batch': pa.array(list(current.values()), pa.int64())
+                })
+            )
+            for _, path in parts:
+                os.remove(path)
+
+    def _ingest_batch(self, batch: List[Dict], metrics: List[str]) -> int:
+
+        table, entities = build_panel_table(batch, metrics)
+        table = table[pd.to_numeric(table['cik'], errors='coerce').notna()]
+        self.write(table, entities)
+        return len(entities)
+
+    def _read_parts(self, directory: str, schema):
+        # Every part of a directory, oldest first, memory-mapped
+        parts = self._parts(directory)
+        if not parts:
+            return schema.empty_table()
+        tables = [ipc.open_file(pa.memory_map(path, 'r')).read_all() for _, path in parts]
+        return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+    def _current_batches(self) -> Dict[int, int]:
+        """{cik: batch holding the company's current rows}"""
+        table = self._read_parts(os.path.join(self.root, 'entities'), _entity_schema())
+        return dict(zip(table['cik'].to_pylist(), table['batch'].to_pylist()))
+
+    @staticmethod
+    def _current_rows(table, current: Dict[int, int]):
+        # Rows of earlier batches were superseded by the company's latest write
+        ciks = pa.array(list(current.keys()), pa.int64())
+        batches = pa.array(list(current.values()), pa.int64())
+        expected = pc.take(batches, pc.index_in(table['cik'], value_set=ciks))
+        return table.filter(pc.fill_null(pc.equal(table['batch'], expected), False))
+
+    def _metric_dir(self, metric: str) -> str:
+
+        return os.path.join(self.root, f'metric={metric}')
+
+    @staticmethod
+    def _parts(directory: str) -> List:
+
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+
+        parts = []
+        for name in names:
+            match = _PART_PATTERN.match(name)
+            if match:
+                parts.append((int(match.group(1)), os.path.join(directory, name)))
+        return sorted(parts)
+
+    def _next_batch(self) -> int:
+
+        directories = [os.path.join(self.root, 'entities')] + [self._metric_dir(metric) for metric in self.metrics()]
+        numbers = [number for directory in directories for number, _ in self._parts(directory)]
+        return max(numbers) + 1 if numbers else 0
+
+    @staticmethod
+    def _to_arrow(rows: pd.DataFrame, batch: int):
+
+        frame = rows[STORE_COLUMNS].copy()
+        frame['cik'] = frame['cik'].astype('int64')
+        frame['fy'] = pd.to_numeric(frame['fy'], errors='coerce').astype('Int32')
+        frame['val'] = frame['val'].astype('float64')
+        frame['batch'] = batch
+        return pa.Table.from_pandas(frame, schema=_schema(), preserve_index=False)
+
+    @staticmethod
+    def _write_file(path: str, table) -> None:
+
+        def write(f):
+            with ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+
+        write_atomic(path, write)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Build the columnar metric store from the SEC bulk companyfacts.zip')
+    parser.add_argument('zip_path', nargs='?', default=BULK_COMPANYFACTS_ZIP)
+    parser.add_argument('--root', default=METRIC_STORE_DIR)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from utils.bulk_ingest import iter_bulk_company_facts
+
+    store = MetricStore(args.root)
+    companies = (company_data for _, company_data in iter_bulk_company_facts(args.zip_path, selective=True))
+    stored = store.ingest(companies, batch_size=args.batch_size)
+    store.compact()
+
+    print(f"Stored {stored} companies in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
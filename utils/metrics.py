@@ -0,0 +1,206 @@
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+from config import METRICS_ENABLED, METRICS_BUCKETS
+
+
+class Histogram:
+
+    def __init__(self, buckets: Sequence[float] = METRICS_BUCKETS):
+
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process counters and latency histograms, rendered as Prometheus text
+
+    Recording is a dict update under a lock (~1µs), cheap enough to leave on
+    in production; METRICS_ENABLED=0 turns every call into a no-op.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+
+        self.enabled = enabled
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str) -> None:
+
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """Time a block into the stage_seconds histogram (recorded even if it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('red_flags_stage_seconds', time.perf_counter() - started, stage=stage, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0.0)
+
+    def snapshot(self) -> Dict:
+        """Plain-dict copy: {'counters': {...}, 'histograms': {...}} keyed by 'name{labels}'"""
+        with self._lock:
+            counters = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                _series(name, labels): {'count': h.count, 'sum': h.sum, 'mean': h.sum / h.count if h.count else 0.0}
+                for (name, labels), h in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self) -> str:
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                self._header(lines, name, 'counter')
+                for (series, labels), value in sorted(self._counters.items()):
+                    if series == name:
+                        lines.append(f'{_series(name, labels)} {_number(value)}')
+
+            for name in sorted({name for name, _ in self._histograms}):
+                self._header(lines, name, 'histogram')
+                for (series, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if series != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else _number(bound)
+                        lines.append(f'{_series(name + "_bucket", labels + (("le", le),))} {cumulative}')
+                    lines.append(f'{_series(name + "_sum", labels)} {_number(histogram.sum)}')
+                    lines.append(f'{_series(name + "_count", labels)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _header(self, lines, name: str, kind: str) -> None:
+
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+
+
+def _label_key(labels: Dict) -> Tuple:
+
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _series(name: str, labels: Tuple) -> str:
+
+    if not labels:
+        return name
+    rendered = ','.join(
+        f'{key}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels
+    )
+    return f'{name}{{{rendered}}}'
+
+
+def _number(value: float) -> str:
+
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+REGISTRY.describe('red_flags_stage_seconds', 'Wall time per pipeline stage')
+REGISTRY.describe('sec_http_requests_total', 'HTTP responses from SEC by status code')
+REGISTRY.describe('sec_http_retries_total', 'SEC requests retried after 429/5xx/connection errors')
+REGISTRY.describe('sec_http_request_seconds', 'Latency of single SEC HTTP attempts')
+REGISTRY.describe('cache_requests_total', 'Cache lookups by cache and result (hit, miss, revalidated, stale)')
+REGISTRY.describe('llm_first_token_seconds', 'Time from LLM request to first streamed token')
+REGISTRY.describe('llm_requests_total', 'LLM narrative requests by provider and outcome')
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+span = REGISTRY.span
+
+
+def dump_metrics() -> str:
+    """Prometheus text exposition of everything recorded in this process"""
+    return REGISTRY.render_prometheus()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = '0.0.0.0') -> Optional['ThreadingHTTPServer']:
+    """Serve /metrics on a background thread (once per process)"""
+    global _server
+
+    # http.server is only loaded by processes that expose metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+
+            body = dump_metrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint unavailable on port {port}: {e}", file=sys.stderr)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+    return _server
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+from config import CACHE_DIR, NARRATIVE_CACHE_TTL, NARRATIVE_CACHE_MAX_BYTES
+from utils.disk_cache import DiskCache
+from utils.metrics import inc
+
+
+_narrative_cache = DiskCache(
+    os.path.join(CACHE_DIR, 'narratives'),
+    ttl_seconds=NARRATIVE_CACHE_TTL,
+    max_bytes=NARRATIVE_CACHE_MAX_BYTES
+)
+
+
+def narrative_key(analysis_results: Dict, provider: str, model: str, temperature: float) -> str:
+    """Hash of everything that shapes the prompt, plus the model settings
+
+    Only what the prompt actually shows is included (entity, overall signal,
+    flag counts, findings messages), so re-running an unchanged analysis
+    maps to the same key.
+    """
+    summary = analysis_results.get('summary') or {}
+    findings = [
+        [name, result.get('severity'), (result.get('message') or '').strip()]
+        for name, result in (analysis_results.get('red_flags') or {}).items()
+        if result.get('status') == 'OK'
+    ]
+
+    inputs = {
+        'provider': provider,
+        'model': model,
+        'temperature': round(float(temperature), 4),
+        'entity': (analysis_results.get('entity_name') or '').strip(),
+        'overall': analysis_results.get('overall_assessment'),
+        'counts': [summary.get(f'{color}_flags_count') for color in ('red', 'yellow', 'green')],
+        'findings': findings
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_cached_narrative(key: str) -> Optional[str]:
+
+    cached = _narrative_cache.get(f'narrative/{key}')
+    if cached is None or not cached.is_fresh:
+        inc('cache_requests_total', cache='narrative', result='miss')
+        return None
+    inc('cache_requests_total', cache='narrative', result='hit')
+    return cached.data.decode('utf-8')
+
+
+def store_narrative(key: str, narrative: str) -> None:
+    """Store a successful narrative (never error or fallback text)"""
+    _narrative_cache.put(f'narrative/{key}', narrative.encode('utf-8'))
@@ -1,13 +1,21 @@
-from typing import Dict, List
-from utils.sec_api import (
-    get_yoy_comparison,
-    get_latest_quarterly_values,
-    extract_metric,
-    get_company_info
-)
+import time
+import numpy as np
+from typing import AsyncIterator, Dict, Iterable
+from utils.extraction import get_company_info
+from utils.metric_index import MetricIndex
+from utils.metrics import observe
+from utils.rules import RED_FLAG_RULES
 from config import RED_FLAG_THRESHOLDS
 
 
+# Metrics read by the rules, extracted in one pass
+ANALYZED_METRICS = RED_FLAG_RULES.metrics
+
+# Bump whenever analyze_all() can give a different result for the same facts
+# and rules: output shape, extraction, period matching or tie-breaking
+RESULT_SCHEMA_VERSION = 1
+
+
 class RedFlagAnalyzer:
     
     def __init__(self, company_data: Dict):
@@ -16,209 +24,60 @@ class RedFlagAnalyzer:
         self.company_info = get_company_info(company_data)
         self.entity_name = self.company_info['name']
         
+        # Extracted once, shared by every check
+        self.metrics = MetricIndex(company_data, ANALYZED_METRICS)
+        self.timings = {'metric_index': self.metrics.build_seconds}
+        observe('red_flags_stage_seconds', self.metrics.build_seconds, stage='metric_index')
+        self.features = self._features()
+        
     def check_revenue_decline(self) -> Dict:
         """Red Flag 1: Revenue Decline"""
-        current, previous = get_yoy_comparison(self.company_data, 'Revenues')
-        
-        if current is None or previous is None or previous == 0:
-            return self._insufficient_data('revenue')
-        
-        change_pct = ((current - previous) / previous) * 100
-        
-        thresholds = RED_FLAG_THRESHOLDS['revenue_decline']
-        
-        if change_pct < thresholds['red']:
-            severity = 'RED'
-            message = f'Revenue declined {abs(change_pct):.1f}% YoY'
-        elif change_pct < thresholds['yellow']:
-            severity = 'YELLOW'
-            message = f'Revenue declined {abs(change_pct):.1f}% YoY'
-        else:
-            severity = 'GREEN'
-            if change_pct >= 0:
-                message = f'Revenue grew {change_pct:.1f}% YoY'
-            else:
-                message = f'Revenue declined only {abs(change_pct):.1f}% YoY'
-        
-        return {
-            'status': 'OK',
-            'severity': severity,
-            'message': message,
-            'current_value': current,
-            'previous_value': previous,
-            'change_pct': change_pct,
-            'metric': 'Revenue (YoY)'
-        }
+        return self.check('revenue_decline')
     
     def check_margin_compression(self) -> Dict:
         """Red Flag 2: Margin Compression"""
-        revenue_curr, revenue_prev = get_yoy_comparison(self.company_data, 'Revenues')
-        opinc_curr, opinc_prev = get_yoy_comparison(self.company_data, 'OperatingIncome')
-        
-        if None in [revenue_curr, revenue_prev, opinc_curr, opinc_prev]:
-            return self._insufficient_data('operating margin')
-        
-        if revenue_curr == 0 or revenue_prev == 0:
-            return self._insufficient_data('margin (revenue zero)')
-        
-        margin_curr = (opinc_curr / revenue_curr) * 100
-        margin_prev = (opinc_prev / revenue_prev) * 100
-        margin_change = margin_curr - margin_prev
-        
-        thresholds = RED_FLAG_THRESHOLDS['margin_compression']
-        
-        if margin_change < thresholds['red']:
-            severity = 'RED'
-            message = f'Operating margin declined {abs(margin_change):.1f}pp'
-        elif margin_change < thresholds['yellow']:
-            severity = 'YELLOW'
-            message = f'Operating margin declined {abs(margin_change):.1f}pp'
-        else:
-            severity = 'GREEN'
-            if margin_change >= 0:
-                message = f'Operating margin improved {margin_change:.1f}pp'
-            else:
-                message = f'Margin declined only {abs(margin_change):.1f}pp'
-        
-        return {
-            'status': 'OK',
-            'severity': severity,
-            'message': message,
-            'current_margin': margin_curr,
-            'previous_margin': margin_prev,
-            'change_pp': margin_change,
-            'metric': 'Operating Margin'
-        }
+        return self.check('margin_compression')
     
     def check_debt_explosion(self) -> Dict:
         """Red Flag 3: Debt Explosion"""
-        # Try getting long term debt
-        lt_debt_curr, lt_debt_prev = get_yoy_comparison(self.company_data, 'LongTermDebt')
-        curr_debt_curr, curr_debt_prev = get_yoy_comparison(self.company_data, 'CurrentDebt')
-        
-        # Add up debts
-        total_debt_curr = (lt_debt_curr or 0) + (curr_debt_curr or 0)
-        total_debt_prev = (lt_debt_prev or 0) + (curr_debt_prev or 0)
-        
-        if total_debt_curr == 0 or total_debt_prev == 0:
-            return self._insufficient_data('debt')
-        
-        debt_change = ((total_debt_curr - total_debt_prev) / total_debt_prev) * 100
-        
-        thresholds = RED_FLAG_THRESHOLDS['debt_explosion']
-        
-        if debt_change > thresholds['red']:
-            severity = 'RED'
-            message = f'Total debt increased {debt_change:.1f}%'
-        elif debt_change > thresholds['yellow']:
-            severity = 'YELLOW'
-            message = f'Total debt increased {debt_change:.1f}%'
-        else:
-            severity = 'GREEN'
-            if debt_change < 0:
-                message = f'Total debt decreased {abs(debt_change):.1f}%'
-            else:
-                message = f'Debt increased only {debt_change:.1f}%'
-        
-        return {
-            'status': 'OK',
-            'severity': severity,
-            'message': message,
-            'current_debt': total_debt_curr,
-            'previous_debt': total_debt_prev,
-            'change_pct': debt_change,
-            'metric': 'Total Debt (YoY)'
-        }
+        return self.check('debt_explosion')
     
     def check_negative_cash_flow(self) -> Dict:
         """Red Flag 4: Negative Operating Cash Flow"""
-        cash_flows = get_latest_quarterly_values(
-            self.company_data, 
-            'OperatingCashFlow', 
-            periods=4
-        )
-        
-        if len(cash_flows) < 2:
-            return self._insufficient_data('cash flow')
-        
-        # Count consecutives negatives quarters
-        negative_quarters = 0
-        for cf in cash_flows:
-            if cf < 0:
-                negative_quarters += 1
-            else:
-                break
-        
-        thresholds = RED_FLAG_THRESHOLDS['negative_cash_flow']
-        
-        if negative_quarters >= thresholds['red']:
-            severity = 'RED'
-            message = f'{negative_quarters} consecutive quarters with negative OCF'
-        elif negative_quarters >= thresholds['yellow']:
-            severity = 'YELLOW'
-            message = f'{negative_quarters} quarters with negative OCF'
-        else:
-            severity = 'GREEN'
-            message = f'Operating cash flow is positive'
-        
-        return {
-            'status': 'OK',
-            'severity': severity,
-            'message': message,
-            'negative_quarters': negative_quarters,
-            'latest_cash_flows': cash_flows[:4],
-            'metric': 'Operating Cash Flow'
-        }
+        return self.check('negative_cash_flow')
     
     def check_liquidity_deterioration(self) -> Dict:
         """Red Flag 5: Liquidity Deterioration"""
-        curr_assets_curr, curr_assets_prev = get_yoy_comparison(
-            self.company_data, 'CurrentAssets'
-        )
-        curr_liab_curr, curr_liab_prev = get_yoy_comparison(
-            self.company_data, 'CurrentLiabilities'
-        )
-        
-        if None in [curr_assets_curr, curr_liab_curr]:
-            return self._insufficient_data('liquidity')
-        
-        if curr_liab_curr == 0:
-            return self._insufficient_data('liquidity (liabilities zero)')
-        
-        current_ratio = curr_assets_curr / curr_liab_curr
-        
-        thresholds = RED_FLAG_THRESHOLDS['liquidity_deterioration']
-        
-        if current_ratio < thresholds['red']:
-            severity = 'RED'
-            message = f'Current Ratio = {current_ratio:.2f} (< 1.0) - Liquidity risk'
-        elif current_ratio < thresholds['yellow']:
-            severity = 'YELLOW'
-            message = f'Current Ratio = {current_ratio:.2f} - Tight liquidity'
-        else:
-            severity = 'GREEN'
-            message = f'Current Ratio = {current_ratio:.2f} - Healthy liquidity'
-        
-        return {
-            'status': 'OK',
-            'severity': severity,
-            'message': message,
-            'current_ratio': current_ratio,
-            'metric': 'Current Ratio'
-        }
+        return self.check('liquidity_deterioration')
+    
+    def check(self, name: str) -> Dict:
+        """Evaluate one rule of RED_FLAG_RULES for this company"""
+        rule = RED_FLAG_RULES[name]
+        evaluated = rule.evaluate(self.features, RED_FLAG_THRESHOLDS)
+        return rule.result({key: column[0] for key, column in evaluated.items()})
     
     def analyze_all(self) -> Dict:
 
+        checks = {
+            'revenue_decline': self.check_revenue_decline,
+            'margin_compression': self.check_margin_compression,
+            'debt_explosion': self.check_debt_explosion,
+            'negative_cash_flow': self.check_negative_cash_flow,
+            'liquidity_deterioration': self.check_liquidity_deterioration
+        }
+        
+        red_flags = {}
+        for flag_name, check in checks.items():
+            started = time.perf_counter()
+            red_flags[flag_name] = check()
+            elapsed = time.perf_counter() - started
+            self.timings[check.__name__] = elapsed
+            observe('red_flags_stage_seconds', elapsed, stage=check.__name__)
+        
         results = {
             'entity_name': self.entity_name,
             'cik': self.company_info['cik'],
-            'red_flags': {
-                'revenue_decline': self.check_revenue_decline(),
-                'margin_compression': self.check_margin_compression(),
-                'debt_explosion': self.check_debt_explosion(),
-                'negative_cash_flow': self.check_negative_cash_flow(),
-                'liquidity_deterioration': self.check_liquidity_deterioration()
-            }
+            'red_flags': red_flags
         }
         
         # Total score
@@ -249,11 +108,49 @@ class RedFlagAnalyzer:
         
         return results
     
-    def _insufficient_data(self, field_name: str) -> Dict:
-        """Helper to return insufficient data response"""
-        return {
-            'status': 'INSUFFICIENT_DATA',
-            'severity': 'UNKNOWN',
-            'message': f'Insufficient data for {field_name} analysis',
-            'metric': field_name
-        }
+    def _features(self) -> Dict[str, np.ndarray]:
+        """Rule inputs as one-row columns (same names as screening.latest_features)"""
+        features = {}
+        for metric in ANALYZED_METRICS:
+            current, previous = self.metrics.yoy(metric)
+            # Values keep their dtype (ints stay ints in the results); absent ones are NaN
+            features[f'{metric}_current'] = np.array([np.nan if current is None else current])
+            features[f'{metric}_previous'] = np.array([np.nan if previous is None else previous])
+        
+        # Consecutive negative quarters, newest first
+        cash_flows = self.metrics.latest_quarterly('OperatingCashFlow', periods=4)
+        negative_quarters = 0
+        for cf in cash_flows:
+            if cf < 0:
+                negative_quarters += 1
+            else:
+                break
+        
+        features['ocf_quarters'] = np.array([len(cash_flows)])
+        features['ocf_negative_streak'] = np.array([negative_quarters])
+        features['ocf_values'] = np.empty(1, dtype=object)
+        features['ocf_values'][0] = cash_flows
+        
+        return features
+
+
+async def analyze_many_companies(
+    ciks: Iterable[str],
+    concurrency: int = 8
+) -> AsyncIterator[Dict]:
+    """Fetch and analyze many companies, yielding analyze_all() results as they finish
+
+    Failed fetches/analyses yield {'cik': ..., 'error': ...} instead.
+    """
+    # HTTP stack only when fetching; scoring alone never imports requests
+    from utils.sec_api import fetch_many_company_facts
+
+    async for fetched in fetch_many_company_facts(ciks, concurrency=concurrency, selective=True):
+        if fetched.error:
+            yield {'cik': fetched.cik, 'error': fetched.error}
+            continue
+        
+        try:
+            yield RedFlagAnalyzer(fetched.data).analyze_all()
+        except Exception as e:
+            yield {'cik': fetched.cik, 'error': f'{type(e).__name__}: {e}'}
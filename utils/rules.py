@@ -0,0 +1,433 @@
+import ast
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+from config import RED_FLAG_THRESHOLDS
+
+
+class Rule(NamedTuple):
+    """A red-flag signal declared as expressions over metric features
+
+    Expressions are Python arithmetic and comparisons over feature names:
+    <Metric>_current is the metric's latest period and <Metric>_previous
+    its comparison period (same fiscal period a year earlier, see
+    yoy_series); ocf_quarters, ocf_negative_streak and ocf_values describe
+    the latest four 10-Q operating cash flows. Combine conditions with
+    & | ~; missing(a, b, ...) is true when any input is absent and zero(x)
+    counts an absent value as 0. Any metric referenced is extracted in
+    the same pass as the others.
+    """
+    name: str                                          # Result key and RED_FLAG_THRESHOLDS key
+    label: str                                         # 'metric' field of the result
+    value: str                                         # Compared against the red/yellow thresholds
+    direction: str                                     # Flag when value is 'below', 'above' or 'at_least' a threshold
+    insufficient: Tuple[Tuple[str, str], ...] = ()     # (condition, data name for the message); first match wins
+    define: Tuple[Tuple[str, str], ...] = ()           # Named intermediate expressions, in order
+    fields: Tuple[Tuple[str, str], ...] = ()           # Result keys and their expressions ('value' available)
+    messages: Tuple[Tuple[Optional[str], str], ...] = ()  # (condition or None, template); first match wins
+    thresholds: Optional[Dict] = None                  # Used when the thresholds passed in have no entry
+
+
+# Features computed from OperatingCashFlow rather than named after it
+_FEATURE_METRICS = {
+    'ocf_quarters': 'OperatingCashFlow',
+    'ocf_negative_streak': 'OperatingCashFlow',
+    'ocf_values': 'OperatingCashFlow'
+}
+
+_HELPERS = {
+    'missing': lambda *values: np.logical_or.reduce([pd.isna(value) for value in values]),
+    'zero': lambda value: _zero(value),
+    'integer': lambda value: np.nan_to_num(np.asarray(value, dtype=float), nan=0.0).astype(np.int64),
+    'abs': np.abs
+}
+
+# Names message conditions and templates can use besides the rule's fields
+_MESSAGE_NAMES = ('value', 'magnitude', 'red', 'yellow', 'flagged')
+
+_RESERVED_FIELDS = ('value', 'severity', 'missing')
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.UAdd, ast.USub, ast.Invert, ast.BitAnd, ast.BitOr,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE
+)
+
+
+def _compile(expression: str, rule: str):
+    """(code object, names read) for one rule expression; rejects anything but vectorizable arithmetic"""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Rule '{rule}': cannot parse {expression!r}: {e.msg}")
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.BoolOp, ast.Not)):
+            raise ValueError(f"Rule '{rule}': use & | ~ instead of and/or/not in {expression!r}")
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Rule '{rule}': {type(node).__name__} not allowed in {expression!r}")
+        if isinstance(node, ast.Compare) and len(node.ops) > 1:
+            raise ValueError(f"Rule '{rule}': chained comparison in {expression!r}; combine with &")
+        if isinstance(node, ast.Call) and (
+            not isinstance(node.func, ast.Name) or node.func.id not in _HELPERS or node.keywords
+        ):
+            raise ValueError(f"Rule '{rule}': only {', '.join(_HELPERS)} can be called in {expression!r}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"Rule '{rule}': only numeric constants allowed in {expression!r}")
+
+    # Names in source order, so metrics keep the order rules mention them in
+    nodes = sorted((node for node in ast.walk(tree) if isinstance(node, ast.Name)), key=lambda node: node.col_offset)
+    names = list(dict.fromkeys(node.id for node in nodes if node.id not in _HELPERS))
+    return compile(tree, f'<rule {rule}>', 'eval'), names
+
+
+def _run(code, namespace: Dict):
+
+    return eval(code, {'__builtins__': {}}, namespace)
+
+
+def exceeds(direction: str, value, threshold):
+    """Whether value crosses threshold in the rule's direction (broadcasts)"""
+    if direction == 'below':
+        return value < threshold
+    if direction == 'above':
+        return value > threshold
+    return value >= threshold
+
+
+# Overall assessments by level (assessment_level)
+ASSESSMENTS = ('GREEN', 'YELLOW', 'RED')
+
+
+def assessment_level(red_count, yellow_count):
+    """Overall assessment from flag counts as 0 GREEN, 1 YELLOW, 2 RED; same rule as analyze_all() (broadcasts)"""
+    red_count = np.asarray(red_count)
+    return np.where(red_count >= 2, 2, (red_count >= 1) | (np.asarray(yellow_count) >= 3)).astype(np.int8)
+
+
+def assess(red_count, yellow_count):
+    """Overall assessment from flag counts, same rule as analyze_all() (broadcasts)"""
+    return np.asarray(ASSESSMENTS)[assessment_level(red_count, yellow_count)]
+
+
+class CompiledRule:
+    """A Rule with every expression parsed and compiled once"""
+
+    def __init__(self, rule: Rule):
+
+        if rule.direction not in ('below', 'above', 'at_least'):
+            raise ValueError(f"Rule '{rule.name}': unknown direction {rule.direction!r}")
+        reserved = [key for key, _ in rule.fields if key in _RESERVED_FIELDS]
+        if reserved:
+            raise ValueError(f"Rule '{rule.name}': field names {reserved} are reserved")
+
+        self.rule = rule
+        self.name = rule.name
+
+        read = []
+        self._define = []
+        for name, expression in rule.define:
+            code, names = _compile(expression, rule.name)
+            self._define.append((name, code))
+            read.append(names)
+        self._insufficient = []
+        for condition, data_name in rule.insufficient:
+            code, names = _compile(condition, rule.name)
+            self._insufficient.append((code, data_name))
+            read.append(names)
+        self._value, names = _compile(rule.value, rule.name)
+        read.append(names)
+
+        field_read = []
+        self._fields = []
+        for key, expression in rule.fields:
+            code, names = _compile(expression, rule.name)
+            self._fields.append((key, code))
+            field_read.append(names)
+
+        local = {name for name, _ in rule.define} | {'value'}
+        # Features read, in order of first mention
+        self.inputs = _ordered(read, local)
+        self.field_inputs = [name for name in _ordered(field_read, local) if name not in self.inputs]
+
+        allowed = set(_MESSAGE_NAMES) | {key for key, _ in rule.fields}
+        self._messages = []
+        for condition, template in rule.messages:
+            code = None
+            if condition is not None:
+                code, names = _compile(condition, rule.name)
+                unknown = set(names) - allowed
+                if unknown:
+                    raise ValueError(f"Rule '{rule.name}': message condition reads {sorted(unknown)}")
+            self._messages.append((code, template))
+
+    def limits(self, thresholds: Mapping) -> Dict:
+
+        found = thresholds.get(self.name, self.rule.thresholds)
+        if found is None:
+            raise KeyError(f"No thresholds for rule '{self.name}'")
+        return found
+
+    def evaluate(self, columns: Mapping[str, np.ndarray], thresholds: Mapping = RED_FLAG_THRESHOLDS,
+                 details: bool = True) -> Dict[str, np.ndarray]:
+        """value, severity, missing (and fields with details=True) for every row of columns"""
+        needed = self.inputs + (self.field_inputs if details else [])
+        absent = [name for name in needed if name not in columns]
+        if absent:
+            raise KeyError(f"Rule '{self.name}' needs features {absent}")
+
+        n = len(next(iter(columns.values()))) if columns else 0
+        namespace = dict(_HELPERS)
+        namespace.update(columns)
+
+        with np.errstate(all='ignore'):
+            for name, code in self._define:
+                namespace[name] = _run(code, namespace)
+
+            conditions = [np.broadcast_to(np.asarray(_run(code, namespace), dtype=bool), (n,))
+                          for code, _ in self._insufficient]
+            missing = np.select(conditions, [data_name for _, data_name in self._insufficient], None) \
+                if conditions else np.full(n, None, dtype=object)
+            insufficient = np.not_equal(missing, None)
+
+            value = np.broadcast_to(np.asarray(_run(self._value, namespace), dtype=float), (n,))
+            limits = self.limits(thresholds)
+            red = exceeds(self.rule.direction, value, limits['red'])
+            yellow = exceeds(self.rule.direction, value, limits['yellow'])
+
+            result = {
+                'value': np.where(insufficient, np.nan, value),
+                'severity': np.select([insufficient, red, yellow], ['UNKNOWN', 'RED', 'YELLOW'], 'GREEN'),
+                'missing': missing
+            }
+
+            if details:
+                namespace['value'] = value
+                for key, code in self._fields:
+                    result[key] = np.broadcast_to(_run(code, namespace), (n,))
+
+        return result
+
+    def result(self, row: Mapping) -> Dict:
+        """analyze_all()-shaped dict for one evaluated row ({'value', 'severity', 'missing', fields...})"""
+        if isinstance(row['missing'], str):
+            return insufficient_data(row['missing'])
+
+        value = _native(row['value'])
+        severity = str(row['severity'])
+        fields = {key: _native(row[key]) for key, _ in self.rule.fields}
+        names = {
+            'value': value,
+            'magnitude': abs(value),
+            'red': severity == 'RED',
+            'yellow': severity == 'YELLOW',
+            'flagged': severity in ('RED', 'YELLOW'),
+            **fields
+        }
+
+        message = ''
+        for code, template in self._messages:
+            if code is None or _run(code, dict(names)):
+                message = template.format(**names)
+                break
+
+        return {'status': 'OK', 'severity': severity, 'message': message, **fields, 'metric': self.rule.label}
+
+
+class RuleSet:
+    """Compiled rules evaluated together over a feature table (one row per company or date)"""
+
+    def __init__(self, rules: Iterable[Rule]):
+
+        self.rules = [CompiledRule(rule) for rule in rules]
+        self.names = [rule.name for rule in self.rules]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Rule names must be unique")
+        self._by_name = dict(zip(self.names, self.rules))
+
+        # Metrics to extract, in first-reference order
+        metrics = []
+        for rule in self.rules:
+            for name in rule.inputs + rule.field_inputs:
+                match = re.match(r'^(\w+)_(current|previous)$', name)
+                metric = match.group(1) if match else _FEATURE_METRICS.get(name)
+                if metric and metric not in metrics:
+                    metrics.append(metric)
+        self.metrics = metrics
+
+    def __getitem__(self, name: str) -> CompiledRule:
+        return self._by_name[name]
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def evaluate(self, features: pd.DataFrame, thresholds: Mapping = RED_FLAG_THRESHOLDS,
+                 details: bool = True) -> pd.DataFrame:
+        """Every rule over every row: <rule>_value/_severity/_missing (+ fields), flag counts, overall"""
+        columns = {name: features[name].to_numpy() for name in features.columns}
+        out = {}
+
+        for rule in self.rules:
+            for key, column in rule.evaluate(columns, thresholds, details).items():
+                out[f'{rule.name}_{key}'] = column
+
+        severities = np.stack([out[f'{name}_severity'] for name in self.names], axis=1) if self.names \
+            else np.empty((len(features), 0), dtype=object)
+        out['red_flags_count'] = (severities == 'RED').sum(axis=1)
+        out['yellow_flags_count'] = (severities == 'YELLOW').sum(axis=1)
+        out['green_flags_count'] = (severities == 'GREEN').sum(axis=1)
+        out['overall_assessment'] = assess(out['red_flags_count'], out['yellow_flags_count'])
+
+        evaluation = pd.DataFrame(out, index=features.index)
+        for name in self.names:
+            # Keep None (not NaN) for "has data" so results can test isinstance(str)
+            evaluation[f'{name}_missing'] = pd.Series(out[f'{name}_missing'], index=features.index, dtype=object)
+        return evaluation
+
+    def results(self, row: Mapping) -> Dict[str, Dict]:
+        """{rule name: result dict} for one row of evaluate()"""
+        results = {}
+        for rule in self.rules:
+            prefix = f'{rule.name}_'
+            results[rule.name] = rule.result({
+                key: row[prefix + key] for key in ('value', 'severity', 'missing', *(k for k, _ in rule.rule.fields))
+            })
+        return results
+
+
+def insufficient_data(field_name: str) -> Dict:
+
+    return {
+        'status': 'INSUFFICIENT_DATA',
+        'severity': 'UNKNOWN',
+        'message': f'Insufficient data for {field_name} analysis',
+        'metric': field_name
+    }
+
+
+def _ordered(name_lists: List[List[str]], exclude: set) -> List[str]:
+
+    ordered = []
+    for names in name_lists:
+        for name in names:
+            if name not in exclude and name not in ordered:
+                ordered.append(name)
+    return ordered
+
+
+def _zero(value):
+
+    absent = pd.isna(value)
+    if np.all(absent):
+        # Plain integer 0, so int + absent stays int (as in the scalar checks)
+        return np.zeros(np.shape(value), dtype=np.int64)
+    return np.where(absent, 0, value)
+
+
+def _native(value):
+
+    return value.item() if isinstance(value, np.generic) else value
+
+
+# The five checks of RedFlagAnalyzer; extend with RuleSet(DEFAULT_RULES + (Rule(...),))
+DEFAULT_RULES = (
+    Rule(
+        name='revenue_decline',
+        label='Revenue (YoY)',
+        insufficient=(('missing(Revenues_current, Revenues_previous) | (Revenues_previous == 0)', 'revenue'),),
+        value='(Revenues_current - Revenues_previous) / Revenues_previous * 100',
+        direction='below',
+        fields=(
+            ('current_value', 'Revenues_current'),
+            ('previous_value', 'Revenues_previous'),
+            ('change_pct', 'value')
+        ),
+        messages=(
+            ('flagged', 'Revenue declined {magnitude:.1f}% YoY'),
+            ('value >= 0', 'Revenue grew {value:.1f}% YoY'),
+            (None, 'Revenue declined only {magnitude:.1f}% YoY')
+        )
+    ),
+    Rule(
+        name='margin_compression',
+        label='Operating Margin',
+        insufficient=(
+            ('missing(Revenues_current, Revenues_previous, OperatingIncome_current, OperatingIncome_previous)',
+             'operating margin'),
+            ('(Revenues_current == 0) | (Revenues_previous == 0)', 'margin (revenue zero)')
+        ),
+        define=(
+            ('current_margin', 'OperatingIncome_current / Revenues_current * 100'),
+            ('previous_margin', 'OperatingIncome_previous / Revenues_previous * 100')
+        ),
+        value='current_margin - previous_margin',
+        direction='below',
+        fields=(
+            ('current_margin', 'current_margin'),
+            ('previous_margin', 'previous_margin'),
+            ('change_pp', 'value')
+        ),
+        messages=(
+            ('flagged', 'Operating margin declined {magnitude:.1f}pp'),
+            ('value >= 0', 'Operating margin improved {value:.1f}pp'),
+            (None, 'Margin declined only {magnitude:.1f}pp')
+        )
+    ),
+    Rule(
+        name='debt_explosion',
+        label='Total Debt (YoY)',
+        define=(
+            # A missing component counts as zero debt
+            ('current_debt', 'zero(LongTermDebt_current) + zero(CurrentDebt_current)'),
+            ('previous_debt', 'zero(LongTermDebt_previous) + zero(CurrentDebt_previous)')
+        ),
+        insufficient=(('(current_debt == 0) | (previous_debt == 0)', 'debt'),),
+        value='(current_debt - previous_debt) / previous_debt * 100',
+        direction='above',
+        fields=(
+            ('current_debt', 'current_debt'),
+            ('previous_debt', 'previous_debt'),
+            ('change_pct', 'value')
+        ),
+        messages=(
+            ('flagged', 'Total debt increased {value:.1f}%'),
+            ('value < 0', 'Total debt decreased {magnitude:.1f}%'),
+            (None, 'Debt increased only {value:.1f}%')
+        )
+    ),
+    Rule(
+        name='negative_cash_flow',
+        label='Operating Cash Flow',
+        insufficient=(('ocf_quarters < 2', 'cash flow'),),
+        value='ocf_negative_streak',
+        direction='at_least',
+        fields=(
+            ('negative_quarters', 'integer(value)'),
+            ('latest_cash_flows', 'ocf_values')
+        ),
+        messages=(
+            ('red', '{negative_quarters} consecutive quarters with negative OCF'),
+            ('yellow', '{negative_quarters} quarters with negative OCF'),
+            (None, 'Operating cash flow is positive')
+        )
+    ),
+    Rule(
+        name='liquidity_deterioration',
+        label='Current Ratio',
+        insufficient=(
+            ('missing(CurrentAssets_current, CurrentLiabilities_current)', 'liquidity'),
+            ('CurrentLiabilities_current == 0', 'liquidity (liabilities zero)')
+        ),
+        value='CurrentAssets_current / CurrentLiabilities_current',
+        direction='below',
+        fields=(('current_ratio', 'value'),),
+        messages=(
+            ('red', 'Current Ratio = {value:.2f} (< 1.0) - Liquidity risk'),
+            ('yellow', 'Current Ratio = {value:.2f} - Tight liquidity'),
+            (None, 'Current Ratio = {value:.2f} - Healthy liquidity')
+        )
+    )
+)
+
+RED_FLAG_RULES = RuleSet(DEFAULT_RULES)
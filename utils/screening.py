@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from config import RED_FLAG_THRESHOLDS
+from utils.metric_index import build_panel_table
+from utils.red_flag_analyzer import ANALYZED_METRICS
+from utils.extraction import yoy_series
+from utils.rules import RED_FLAG_RULES, RuleSet
+
+
+# Result keys of the checks, in analyze_all() order
+CHECKS = RED_FLAG_RULES.names
+
+
+class MetricPanel:
+    """Extracted metrics of many companies stacked in one long table"""
+
+    def __init__(self, companies: Iterable[Dict], rules: RuleSet = RED_FLAG_RULES):
+
+        # One DataFrame for the whole universe, holding every metric the rules read
+        self.rules = rules
+        self.table, self.entities = build_panel_table(companies, rules.metrics)
+
+    @classmethod
+    def from_table(cls, table: pd.DataFrame, entities: Dict, rules: RuleSet = RED_FLAG_RULES) -> 'MetricPanel':
+        """Wrap an existing panel table (rows grouped by (cik, metric), newest first)"""
+        panel = cls.__new__(cls)
+        panel.rules = rules
+        panel.table = table
+        panel.entities = entities
+        return panel
+
+    @classmethod
+    def from_store(cls, store, ciks: Optional[Iterable[int]] = None, rules: RuleSet = RED_FLAG_RULES) -> 'MetricPanel':
+        """Load the panel from a MetricStore instead of parsing companyfacts"""
+        entities = store.entities()
+        if ciks is not None:
+            wanted = {int(cik) for cik in ciks}
+            entities = {cik: name for cik, name in entities.items() if cik in wanted}
+        return cls.from_table(store.read_panel(rules.metrics, ciks), entities, rules)
+
+    def features(self) -> pd.DataFrame:
+        """latest_features() of every company for the metrics the rules read"""
+        return latest_features(self.table, list(self.entities), self.rules.metrics)
+
+    def screen(self, thresholds: Dict = RED_FLAG_THRESHOLDS) -> Dict:
+        """analyze_all()-shaped results for every company, keyed by cik"""
+        evaluation = evaluate_features(self.features(), thresholds, self.rules)
+        return panel_results(evaluation, self.entities, self.rules)
+
+    def backtest(self, thresholds: Dict = RED_FLAG_THRESHOLDS) -> pd.DataFrame:
+        """Red flags at every past reporting period of every company (see utils.backtest)"""
+        from utils.backtest import backtest_table
+        return backtest_table(self.table, thresholds, self.rules)
+
+    def sweep(self, grid: pd.DataFrame, thresholds: Dict = RED_FLAG_THRESHOLDS) -> pd.DataFrame:
+        """Flag counts and assessment shifts under every threshold configuration of grid (see utils.sweep)"""
+        from utils.sweep import sweep_features
+        return sweep_features(self.features(), grid, thresholds, self.rules)
+
+
+def latest_features(
+    table: pd.DataFrame,
+    ciks: Optional[List] = None,
+    metrics: List[str] = ANALYZED_METRICS
+) -> pd.DataFrame:
+    """One row per company with the inputs of the rules
+
+    Columns are <metric>_current / <metric>_previous (same values as
+    MetricIndex.yoy) plus the latest 10-Q operating cash flows.
+    """
+    index = pd.Index(ciks if ciks is not None else table['cik'].unique(), name='cik')
+    features = pd.DataFrame(index=index)
+
+    if table.empty:
+        for metric in metrics:
+            features[f'{metric}_current'] = np.nan
+            features[f'{metric}_previous'] = np.nan
+        features['ocf_quarters'] = 0
+        features['ocf_negative_streak'] = 0
+        features['ocf_values'] = [[] for _ in range(len(index))]
+        return features
+
+    history = yoy_series(table, by=['cik', 'metric'])
+    groups = history.groupby(['cik', 'metric'], sort=False)
+
+    # Latest period per (cik, metric); a single period gives no comparison at all
+    is_latest = groups.cumcount().to_numpy() == 0
+    has_history = groups['val'].transform('size').to_numpy() >= 2
+    latest = history[is_latest & has_history]
+
+    current = latest.pivot(index='cik', columns='metric', values='val')
+    previous = latest.pivot(index='cik', columns='metric', values='previous_val')
+
+    for metric in metrics:
+        features[f'{metric}_current'] = current[metric].reindex(index) if metric in current else np.nan
+        features[f'{metric}_previous'] = previous[metric].reindex(index) if metric in previous else np.nan
+
+    # Latest four 10-Q operating cash flows and their leading negative streak
+    quarterly = table[(table['metric'] == 'OperatingCashFlow') & (table['form'] == '10-Q')]
+    quarterly = quarterly.groupby('cik', sort=False).head(4)
+    negative = (quarterly['val'] < 0).astype(int)
+    streak = negative.groupby(quarterly['cik']).cumprod().groupby(quarterly['cik']).sum()
+
+    features['ocf_quarters'] = quarterly.groupby('cik').size().reindex(index, fill_value=0)
+    features['ocf_negative_streak'] = streak.reindex(index, fill_value=0)
+    values = quarterly.groupby('cik')['val'].agg(list).reindex(index)
+    features['ocf_values'] = [v if isinstance(v, list) else [] for v in values]
+
+    return features
+
+
+def evaluate_features(
+    features: pd.DataFrame,
+    thresholds: Dict = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES,
+    details: bool = True
+) -> pd.DataFrame:
+    """Severity, value and missing-data reason of every rule as array operations (see RuleSet.evaluate)"""
+    return rules.evaluate(features, thresholds, details)
+
+
+def panel_results(evaluation: pd.DataFrame, entities: Dict, rules: RuleSet = RED_FLAG_RULES) -> Dict:
+    """Turn the evaluated panel back into analyze_all()-shaped dicts"""
+    results = {}
+
+    for cik, row in evaluation.to_dict('index').items():
+        results[cik] = {
+            'entity_name': entities.get(cik, 'Unknown'),
+            'cik': cik,
+            'red_flags': rules.results(row),
+            'overall_assessment': row['overall_assessment'],
+            'summary': {
+                'red_flags_count': int(row['red_flags_count']),
+                'yellow_flags_count': int(row['yellow_flags_count']),
+                'green_flags_count': int(row['green_flags_count'])
+            }
+        }
+
+    return results
+
+
+def screen_companies(
+    companies: Iterable[Dict],
+    thresholds: Dict = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> Dict:
+    """Screen many companies at once; same per-company schema as analyze_all()"""
+    return MetricPanel(companies, rules).screen(thresholds)
@@ -1,132 +1,298 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
 import requests
-import pandas as pd
-from typing import Dict, List, Optional, Tuple
-from config import SEC_BASE_URL, SEC_HEADERS, TICKER_TO_CIK, FIELD_MAPPINGS
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, NamedTuple, Optional
+from config import (
+    SEC_BASE_URL,
+    SEC_HEADERS,
+    SEC_RATE_LIMIT,
+    SEC_RATE_BURST,
+    SEC_TIMEOUT,
+    SEC_MAX_RETRIES,
+    SEC_BACKOFF_BASE,
+    SEC_BACKOFF_MAX,
+    SEC_POOL_SIZE,
+    TICKER_TO_CIK,
+    CACHE_DIR,
+    COMPANY_FACTS_CACHE_TTL,
+    COMPANY_FACTS_CACHE_MAX_BYTES
+)
+from utils.disk_cache import DiskCache
+from utils.metrics import inc, observe, span
+from utils.facts_parser import parse_company_facts
+from utils.ticker_index import get_ticker_index
 
 
-def get_company_cik(ticker: str) -> Optional[str]:
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
-    return TICKER_TO_CIK.get(ticker.upper())
 
+class RateLimiter:
+    """Thread-safe token bucket shared by every SEC request in the process"""
 
-def fetch_company_facts(cik: str) -> Optional[Dict]:
+    def __init__(self, rate: float, burst: int):
 
-    url = f'{SEC_BASE_URL}/api/xbrl/companyfacts/CIK{cik}.json'
-    
-    try:
-        response = requests.get(url, headers=SEC_HEADERS, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-        return None
+        self.rate = rate
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
+    def acquire(self) -> None:
+        """Block until a request token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
 
-def extract_field_values_smart(
-    company_data: Dict, 
-    field_names: List[str], 
-    unit: str = 'USD'
-) -> pd.DataFrame:
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
 
-    all_data = []
-    
-    for field_name in field_names:
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+_rate_limiter = RateLimiter(SEC_RATE_LIMIT, SEC_RATE_BURST)
+
+
+def configure_rate_limit(rate: float, burst: Optional[int] = None) -> None:
+    """Resize this process's share of the SEC budget (e.g. SEC_RATE_LIMIT / workers)"""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(rate, burst if burst is not None else max(1, int(rate)))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_sec_session() -> requests.Session:
+    """Shared keep-alive session (recreated after fork so pools aren't shared)"""
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SEC_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(SEC_HEADERS)
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+            _session = session
+            _session_pid = os.getpid()
+
+    return _session
+
+
+def _backoff_delay(attempt: int, response: Optional[requests.Response] = None) -> float:
+
+    # Honour Retry-After when SEC sends one
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), SEC_BACKOFF_MAX)
+
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(SEC_BACKOFF_MAX, SEC_BACKOFF_BASE * (2 ** attempt)))
+
+
+def sec_get(
+    url: str,
+    headers: Optional[Dict] = None,
+    timeout: float = SEC_TIMEOUT
+) -> requests.Response:
+    """Rate-limited GET against SEC with retry/backoff on 429, 5xx and connection errors"""
+    session = get_sec_session()
+
+    for attempt in range(SEC_MAX_RETRIES + 1):
+        _rate_limiter.acquire()
+
+        started = time.perf_counter()
         try:
-            facts = company_data['facts']['us-gaap'][field_name]['units'][unit]
-            df = pd.DataFrame(facts)
-            df['field_source'] = field_name
-            all_data.append(df)
-        except (KeyError, TypeError):
+            response = session.get(url, headers=headers, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            inc('sec_http_requests_total', status=type(e).__name__)
+            if attempt == SEC_MAX_RETRIES:
+                raise
+            inc('sec_http_retries_total')
+            time.sleep(_backoff_delay(attempt))
             continue
-    
-    if not all_data:
-        return pd.DataFrame()
-    
-    # Combine DataFrames
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Filter  10-K e 10-Q (main reports)
-    combined_df = combined_df[combined_df['form'].isin(['10-K', '10-Q'])].copy()
-    
-    # Convert
-    combined_df['end'] = pd.to_datetime(combined_df['end'])
-    
-    # Date ordering
-    combined_df = combined_df.sort_values('end', ascending=False)
-    
-    # Remove duplicates
-    combined_df = combined_df.drop_duplicates(subset=['end'], keep='first')
-    
-    return combined_df[['end', 'val', 'fy', 'fp', 'form', 'field_source']].reset_index(drop=True)
+        finally:
+            observe('sec_http_request_seconds', time.perf_counter() - started)
 
+        inc('sec_http_requests_total', status=response.status_code)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == SEC_MAX_RETRIES:
+            return response
 
-def extract_metric(
-    company_data: Dict, 
-    metric_name: str, 
-    verbose: bool = False
-) -> pd.DataFrame:
+        inc('sec_http_retries_total')
+        delay = _backoff_delay(attempt, response)
+        response.close()
+        time.sleep(delay)
 
-    if metric_name not in FIELD_MAPPINGS:
-        if verbose:
-            print(f"Metric '{metric_name}' not mapped. Trying direct field...")
-        return extract_field_values_smart(company_data, [metric_name])
-    
-    field_names = FIELD_MAPPINGS[metric_name]
-    df = extract_field_values_smart(company_data, field_names)
-    
-    if not df.empty and verbose:
-        sources = df['field_source'].unique()
-        print(f"{metric_name}: {len(df)} periods using {', '.join(sources)}")
+    return response
+
+
+_facts_cache = DiskCache(
+    os.path.join(CACHE_DIR, 'companyfacts'),
+    ttl_seconds=COMPANY_FACTS_CACHE_TTL,
+    max_bytes=COMPANY_FACTS_CACHE_MAX_BYTES
+)
+
+
+def get_company_cik(ticker: str) -> Optional[str]:
+
+    ticker = ticker.strip().upper()
     
-    return df
+    # Curated list first, then the full SEC ticker snapshot
+    return TICKER_TO_CIK.get(ticker) or get_ticker_index().cik(ticker)
+
+
+def fetch_company_facts(
+    cik: str,
+    use_cache: bool = True,
+    selective: bool = False,
+    revalidate: bool = False,
+    base_url: Optional[str] = None
+) -> Optional[Dict]:
+    """companyfacts for cik; selective=True keeps only FIELD_MAPPINGS concepts and 10-K/10-Q facts
+
+    revalidate=True skips the TTL and always asks SEC (conditionally) for a
+    newer copy, e.g. once a new filing is known to exist. base_url overrides
+    SEC_BASE_URL (e.g. a local stand-in).
+    """
+    try:
+        return _fetch_company_facts(cik, use_cache, selective, revalidate, base_url)
+    except requests.exceptions.RequestException as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
 
 
-def get_yoy_comparison(
-    company_data: Dict, 
-    metric_name: str
-) -> Tuple[Optional[float], Optional[float]]:
+def _fetch_company_facts(
+    cik: str,
+    use_cache: bool,
+    selective: bool = False,
+    revalidate: bool = False,
+    base_url: Optional[str] = None
+) -> Dict:
 
-    df = extract_metric(company_data, metric_name)
+    parse = parse_company_facts if selective else json.loads
+    url = f'{base_url or SEC_BASE_URL}/api/xbrl/companyfacts/CIK{cik}.json'
+    cache_key = f'companyfacts/CIK{cik}'
     
-    if df.empty or len(df) < 2:
-        return None, None
+    def decode(data: bytes) -> Dict:
+        with span('json_parse'):
+            return parse(data)
     
-    current = df.iloc[0]['val']
-    current_fp = df.iloc[0]['fp']
-    current_fy = df.iloc[0]['fy']
+    cached = _facts_cache.get(cache_key) if use_cache else None
+    if cached is not None and cached.is_fresh and not revalidate:
+        inc('cache_requests_total', cache='companyfacts', result='hit')
+        return decode(cached.data)
     
-    previous = None
-    for i in range(1, len(df)):
-        row = df.iloc[i]
-        if row['fp'] == current_fp and row['fy'] == (current_fy - 1):
-            previous = row['val']
-            break
+    # Conditional GET: SEC answers 304 without a body when unchanged
+    headers = {}
+    if cached is not None:
+        if cached.meta.get('etag'):
+            headers['If-None-Match'] = cached.meta['etag']
+        if cached.meta.get('last_modified'):
+            headers['If-Modified-Since'] = cached.meta['last_modified']
+    
+    try:
+        with span('sec_download'):
+            response = sec_get(url, headers=headers)
+        
+        if response.status_code == 304 and cached is not None:
+            inc('cache_requests_total', cache='companyfacts', result='revalidated')
+            _facts_cache.touch(cache_key)
+            return decode(cached.data)
+        
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        # Serve the stale copy rather than nothing
+        if cached is not None:
+            inc('cache_requests_total', cache='companyfacts', result='stale')
+            print(f"Error: {e} (using cached copy)", file=sys.stderr)
+            return decode(cached.data)
+        raise
     
-    if previous is None and len(df) >= 5:
-        previous = df.iloc[4]['val']
+    inc('cache_requests_total', cache='companyfacts', result='miss')
+    if use_cache:
+        _facts_cache.put(cache_key, response.content, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        })
     
-    return current, previous
+    return decode(response.content)
+
 
+class CompanyFactsResult(NamedTuple):
+    cik: str
+    data: Optional[Dict]
+    error: Optional[str]
 
-def get_latest_quarterly_values(
-    company_data: Dict, 
-    metric_name: str, 
-    periods: int = 4
-) -> List[float]:
 
-    df = extract_metric(company_data, metric_name)
+async def fetch_many_company_facts(
+    ciks: Iterable[str],
+    concurrency: int = 8,
+    use_cache: bool = True,
+    selective: bool = False
+) -> AsyncIterator[CompanyFactsResult]:
+    """Fetch many companies concurrently, yielding results as they complete
+
+    Requests still pass through the shared rate limiter, so concurrency only
+    overlaps network latency; a failing CIK is reported in its result's
+    `error` instead of aborting the batch.
+    """
+    ciks = list(dict.fromkeys(ciks))
+    if not ciks:
+        return
     
-    if df.empty:
-        return []
+    loop = asyncio.get_running_loop()
     
-    quarterly = df[df['form'] == '10-Q'].head(periods)
+    def load(cik: str) -> CompanyFactsResult:
+        try:
+            return CompanyFactsResult(cik, _fetch_company_facts(cik, use_cache, selective), None)
+        except Exception as e:
+            return CompanyFactsResult(cik, None, f'{type(e).__name__}: {e}')
     
-    return quarterly['val'].tolist()
+    # The pool size is the concurrency cap
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    tasks = [loop.run_in_executor(executor, load, cik) for cik in ciks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Not `with`: its shutdown(wait=True) would block the event loop on every
+        # queued call when the consumer stops early (break / aclose())
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Frame helpers moved to utils.extraction (pandas-only, no HTTP stack); old
+# imports keep working but load pandas on first access, not with this module
+_EXTRACTION_NAMES = {
+    'extract_field_values_smart',
+    'extract_metric',
+    'get_yoy_comparison',
+    'yoy_from_frame',
+    'yoy_series',
+    'get_latest_quarterly_values',
+    'quarterly_values_from_frame',
+    'get_company_info'
+}
 
 
-def get_company_info(company_data: Dict) -> Dict[str, str]:
+def __getattr__(name: str):
 
-    return {
-        'name': company_data.get('entityName', 'Unknown'),
-        'cik': company_data.get('cik', 'Unknown')
-    }
+    if name in _EXTRACTION_NAMES:
+        from utils import extraction
+        return getattr(extraction, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,7 @@
+def to_jsonable(value):
+    """json.dumps default= hook for the numpy scalars pandas leaves in results"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
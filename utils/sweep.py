@@ -0,0 +1,183 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Mapping, Sequence
+from config import RED_FLAG_THRESHOLDS, SWEEP_CHUNK_CELLS, SWEEP_DEFAULT_GRID
+from utils.rules import ASSESSMENTS, RED_FLAG_RULES, RuleSet, assessment_level, exceeds
+
+
+def threshold_grid(
+    ranges: Mapping[str, Mapping[str, Sequence[float]]] = SWEEP_DEFAULT_GRID,
+    thresholds: Mapping = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> pd.DataFrame:
+    """Every combination of the candidate red/yellow values, one configuration per row
+
+    Columns are <rule>_red and <rule>_yellow; rules or levels missing from
+    ranges keep their value in thresholds.
+    """
+    unknown = sorted(set(ranges) - set(rules.names))
+    if unknown:
+        raise KeyError(f"No rules named {unknown}")
+
+    axes = {}
+    for rule in rules:
+        limits = rule.limits(thresholds)
+        candidates = ranges.get(rule.name, {})
+        for level in ('red', 'yellow'):
+            axes[f'{rule.name}_{level}'] = np.asarray(candidates.get(level, [limits[level]]), dtype=float)
+
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    return pd.DataFrame({name: values.ravel() for name, values in zip(axes, mesh)})
+
+
+def grid_thresholds(config: Mapping, thresholds: Mapping = RED_FLAG_THRESHOLDS,
+                    rules: RuleSet = RED_FLAG_RULES) -> Dict:
+    """RED_FLAG_THRESHOLDS-shaped dict for one grid row (e.g. to screen with it)"""
+    result = {}
+    for rule in rules:
+        limits = rule.limits(thresholds)
+        result[rule.name] = {
+            level: config.get(f'{rule.name}_{level}', limits[level]) for level in ('red', 'yellow')
+        }
+    return result
+
+
+def sweep_features(
+    features: pd.DataFrame,
+    grid: pd.DataFrame,
+    thresholds: Mapping = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES,
+    chunk_cells: int = SWEEP_CHUNK_CELLS
+) -> pd.DataFrame:
+    """Flag counts and overall assessments under every configuration of grid
+
+    Rule values are computed once from features (one row per company, or
+    per (cik, as_of) from backtest_features); each configuration then only
+    compares them against its thresholds. Every row of grid gets, besides
+    its thresholds:
+      <rule>_red_count / <rule>_yellow_count  companies the rule flags
+      red / yellow / green                    companies per overall assessment
+      changed / escalated / relaxed           companies whose assessment differs
+                                              from (is above / below) the one
+                                              under thresholds
+    """
+    if len(rules.rules) > 7:
+        raise ValueError("sweep_features supports at most 7 rules")
+
+    evaluation = rules.evaluate(features, thresholds, details=False)
+    n = len(features)
+
+    baseline = assessment_level(evaluation['red_flags_count'].to_numpy(), evaluation['yellow_flags_count'].to_numpy())
+
+    result = {name: grid[name].to_numpy() for name in grid.columns}
+    # Per company and configuration: red count * 8 + yellow count (up to 7 rules fit in int8)
+    pair_codes = []
+    for rule in rules:
+        value = evaluation[f'{rule.name}_value'].to_numpy(dtype=float)
+        limits = rule.limits(thresholds)
+        red_limit = grid[f'{rule.name}_red'].to_numpy(dtype=float) if f'{rule.name}_red' in grid \
+            else np.full(len(grid), limits['red'], dtype=float)
+        yellow_limit = grid[f'{rule.name}_yellow'].to_numpy(dtype=float) if f'{rule.name}_yellow' in grid \
+            else np.full(len(grid), limits['yellow'], dtype=float)
+
+        # Severities only depend on this rule's (red, yellow) pair, of which a grid has few
+        pairs, config_pair = np.unique(np.stack([red_limit, yellow_limit], axis=1), axis=0, return_inverse=True)
+        config_pair = config_pair.ravel()
+        with np.errstate(invalid='ignore'):
+            # Insufficient data leaves value NaN, which never crosses a threshold
+            red = exceeds(rule.rule.direction, value[None, :], pairs[:, 0, None])
+            yellow = exceeds(rule.rule.direction, value[None, :], pairs[:, 1, None]) & ~red
+
+        result[f'{rule.name}_red_count'] = red.sum(axis=1)[config_pair]
+        result[f'{rule.name}_yellow_count'] = yellow.sum(axis=1)[config_pair]
+        pair_codes.append((red.astype(np.int8) * 8 + yellow.astype(np.int8), config_pair))
+
+    # Overall level of every packed (red, yellow) count pair
+    packed = np.arange(64)
+    levels = assessment_level(packed // 8, packed % 8)
+
+    counts = {name: np.zeros(len(grid), dtype=np.int64)
+              for name in ('red', 'yellow', 'green', 'changed', 'escalated', 'relaxed')}
+    step = max(1, chunk_cells // max(n, 1))
+    for start in range(0, len(grid), step):
+        stop = min(start + step, len(grid))
+        code = np.zeros((stop - start, n), dtype=np.int8)
+        for codes, config_pair in pair_codes:
+            code += codes[config_pair[start:stop]]
+        level = levels[code]
+
+        for value, name in enumerate(ASSESSMENTS):
+            counts[name.lower()][start:stop] = (level == value).sum(axis=1)
+        counts['changed'][start:stop] = (level != baseline).sum(axis=1)
+        counts['escalated'][start:stop] = (level > baseline).sum(axis=1)
+        counts['relaxed'][start:stop] = (level < baseline).sum(axis=1)
+
+    result.update(counts)
+    return pd.DataFrame(result, index=grid.index)
+
+
+def sweep_companies(
+    companies,
+    grid: pd.DataFrame,
+    thresholds: Mapping = RED_FLAG_THRESHOLDS,
+    rules: RuleSet = RED_FLAG_RULES
+) -> pd.DataFrame:
+    """sweep_features() over the latest data of many companies"""
+    from utils.screening import MetricPanel
+    return MetricPanel(companies, rules).sweep(grid, thresholds)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Flag counts and assessments under a grid of threshold configurations (CSV output)')
+    parser.add_argument('tickers', nargs='*', help='Tickers or CIKs to fetch; with --store CIKs to keep (none: the whole store)')
+    parser.add_argument('--store', help='Read the universe from this metric store instead of fetching')
+    parser.add_argument('--grid', help='JSON file {rule: {"red": [...], "yellow": [...]}} (default: SWEEP_DEFAULT_GRID)')
+    parser.add_argument('--history', action='store_true', help='Score every past reporting period, not just the latest')
+    parser.add_argument('--output', default='-', help='CSV file (default: stdout)')
+    args = parser.parse_args()
+
+    from utils.screening import MetricPanel
+
+    if args.store or not args.tickers:
+        from utils.metric_store import MetricStore
+        store = MetricStore(args.store) if args.store else MetricStore()
+        panel = MetricPanel.from_store(store, [int(cik) for cik in args.tickers] or None)
+    else:
+        from utils.sec_api import fetch_company_facts, get_company_cik
+
+        companies = []
+        for ticker in args.tickers:
+            cik = ticker if ticker.isdigit() else get_company_cik(ticker)
+            company_data = fetch_company_facts(cik.zfill(10), selective=True) if cik else None
+            if company_data:
+                companies.append(company_data)
+            else:
+                print(f"Skipping {ticker}: no data", file=sys.stderr)
+        panel = MetricPanel(companies)
+
+    ranges = SWEEP_DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            ranges = json.load(f)
+    grid = threshold_grid(ranges)
+
+    if args.history:
+        from utils.backtest import backtest_features
+        features = backtest_features(panel.table, panel.rules.metrics)
+    else:
+        features = panel.features()
+
+    started = time.perf_counter()
+    result = sweep_features(features, grid)
+    print(f"{len(grid)} configurations x {len(features)} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    result.to_csv(sys.stdout if args.output == '-' else args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+from config import COMPANY_TICKERS_PATH, COMPANY_TICKERS_URL
+
+
+class TickerIndex:
+    """Ticker -> CIK index over SEC's full company_tickers.json
+
+    Tickers, CIKs and names are kept as parallel sorted sequences: exact
+    lookups go through a dict of positions, prefix searches bisect the
+    sorted tickers / lowercased names.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, int, str]]):
+
+        # Several tickers can share a CIK (share classes); one row per ticker
+        rows = sorted({ticker.upper(): (cik, title) for ticker, cik, title in entries}.items())
+
+        self.tickers = tuple(ticker for ticker, _ in rows)
+        self.ciks = array('L', (cik for _, (cik, _) in rows))
+        self.titles = tuple(title for _, (_, title) in rows)
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        name_order = sorted(range(len(rows)), key=lambda i: self.titles[i].lower())
+        self._names = [self.titles[i].lower() for i in name_order]
+        self._name_positions = array('L', name_order)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def cik(self, ticker: str) -> Optional[str]:
+        """10-digit CIK for an exact ticker, or None"""
+        position = self._positions.get(ticker.upper())
+        if position is None:
+            return None
+        return str(self.ciks[position]).zfill(10)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, str]]:
+        """(ticker, cik, name) whose ticker, then name, starts with query"""
+        query = query.strip()
+        if not query:
+            return []
+
+        found = []
+        seen = set()
+
+        for position in self._prefix_positions(self.tickers, query.upper(), limit):
+            found.append(position)
+            seen.add(position)
+
+        if len(found) < limit:
+            for name_position in self._prefix_positions(self._names, query.lower(), limit):
+                position = self._name_positions[name_position]
+                if position not in seen:
+                    found.append(position)
+                    seen.add(position)
+                if len(found) >= limit:
+                    break
+
+        return [
+            (self.tickers[i], str(self.ciks[i]).zfill(10), self.titles[i])
+            for i in found[:limit]
+        ]
+
+    @staticmethod
+    def _prefix_positions(keys, prefix: str, limit: int) -> List[int]:
+
+        positions = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix) and len(positions) < limit:
+            positions.append(i)
+            i += 1
+        return positions
+
+
+def load_ticker_index(path: str = COMPANY_TICKERS_PATH) -> TickerIndex:
+    """Build the index from a company_tickers.json snapshot (empty if missing)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ticker snapshot unavailable ({path}): {e}", file=sys.stderr)
+        return TickerIndex([])
+
+    # {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."}, ...}
+    entries = raw.values() if isinstance(raw, dict) else raw
+    return TickerIndex(
+        (entry['ticker'], int(entry['cik_str']), entry.get('title', ''))
+        for entry in entries
+        if entry.get('ticker') and entry.get('cik_str') is not None
+    )
+
+
+@lru_cache(maxsize=1)
+def get_ticker_index() -> TickerIndex:
+    """Process-wide index, loaded on first use"""
+    return load_ticker_index(COMPANY_TICKERS_PATH)
+
+
+def search_tickers(query: str, limit: int = 10) -> List[Tuple[str, str, str]]:
+
+    return get_ticker_index().search(query, limit)
+
+
+def download_company_tickers(path: str = COMPANY_TICKERS_PATH) -> int:
+    """Refresh the local snapshot from SEC; returns the number of tickers"""
+    from utils.disk_cache import write_atomic
+    from utils.sec_api import sec_get
+
+    response = sec_get(COMPANY_TICKERS_URL)
+    response.raise_for_status()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, lambda f: f.write(response.content))
+
+    get_ticker_index.cache_clear()
+    return len(get_ticker_index())
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Ticker -> CIK index over SEC company_tickers.json')
+    parser.add_argument('--download', action='store_true', help=f'Refresh {COMPANY_TICKERS_PATH} from SEC')
+    parser.add_argument('query', nargs='?', help='Ticker or company name prefix to search')
+    args = parser.parse_args()
+
+    if args.download:
+        print(f"Saved {download_company_tickers()} tickers to {COMPANY_TICKERS_PATH}")
+
+    if args.query:
+        for ticker, cik, title in search_tickers(args.query):
+            print(f"{ticker:<8} {cik}  {title}")
+
+
+if __name__ == "__main__":
+    main()